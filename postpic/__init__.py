@@ -63,6 +63,7 @@ from . import datareader
 from .datareader import chooseCode, readDump, readSim
 from ._version import get_versions
 from .io import *
+from ._fft import set_fft_backend, get_fft_backend
 
 __all__ = ['helper']
 __all__ += datahandling.__all__
@@ -72,6 +73,7 @@ __all__ += ['datareader', 'plotting']
 # high level functions
 __all__ += ['chooseCode', 'readDump', 'readSim']
 __all__ += io.__all__
+__all__ += ['set_fft_backend', 'get_fft_backend']
 
 __version__ = get_versions()['version']
 __git_version__ = get_versions()['full-revisionid']
@@ -0,0 +1,378 @@
+#
+# This file is part of postpic.
+#
+# postpic is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# postpic is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with postpic. If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+FFT backends used by `Field.fft`.
+
+A backend provides `fftn` and `ifftn` with the signature of `numpy.fft.fftn`
+and an additional `out` argument, as well as `fftshift` and `fftfreq`.
+`out` may be the input array itself to transform in place.
+The backend in use is chosen by `set_fft_backend`.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import collections
+import json
+import os
+import platform
+import threading
+import time
+
+import numpy as np
+
+from . import helper
+
+try:
+    import scipy.fft as scipy_fft
+except ImportError:
+    # scipy < 1.4
+    scipy_fft = None
+
+try:
+    import pyfftw
+except ImportError:
+    pyfftw = None
+
+try:
+    import mkl_fft.interfaces.numpy_fft as mkl_numpy_fft
+except ImportError:
+    try:
+        # mkl_fft < 1.3
+        import mkl_fft._numpy_fft as mkl_numpy_fft
+    except ImportError:
+        mkl_numpy_fft = None
+
+__all__ = ['set_fft_backend', 'get_fft_backend']
+
+
+def _cachefile(name):
+    '''
+    path of a file in the per user cache directory of postpic. The hostname is part
+    of the filename, as the content is only valid for the machine it was created on.
+    '''
+    cachedir = os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache'))
+    root, ext = os.path.splitext(name)
+    return os.path.join(cachedir, 'postpic', '{}-{}{}'.format(root, platform.node(), ext))
+
+
+def _normaxes(axes, ndim):
+    if axes is None:
+        return tuple(range(ndim))
+    return tuple(ax % ndim for ax in axes)
+
+
+def _hermitian_expand(half, shape, axes, out=None):
+    '''
+    returns the full spectrum of a real array of the given `shape` from the half spectrum
+    `half` along the last of the transformed `axes`, as returned by `rfftn`.
+    '''
+    last = axes[-1]
+    n = shape[last]
+    h = half.shape[last]
+    if out is None:
+        out = np.empty(shape, dtype=half.dtype)
+    sl = [slice(None)] * len(shape)
+    sl[last] = slice(0, h)
+    out[tuple(sl)] = half
+    if n > h:
+        # the missing frequencies -k are the complex conjugate of k.
+        sl[last] = slice(n - h, 0, -1)
+        tail = half[tuple(sl)]
+        for ax in axes[:-1]:
+            sl = [slice(None)] * len(shape)
+            sl[ax] = slice(None, None, -1)
+            tail = np.roll(tail[tuple(sl)], 1, axis=ax)
+        sl = [slice(None)] * len(shape)
+        sl[last] = slice(h, n)
+        np.conjugate(tail, out=out[tuple(sl)])
+    return out
+
+
+class NumpyBackend(object):
+    '''
+    FFTs using `numpy.fft`.
+
+    Transforms of real input only calculate half of the spectrum by `rfftn`. The other half
+    follows from the hermitian symmetry.
+    '''
+    name = 'numpy'
+    _module = np.fft
+    _kwargs = {}
+
+    def _c2c(self, a, axes, norm, out, inverse, **kwargs):
+        kwargs = dict(self._kwargs, **kwargs)
+        if norm is not None:
+            kwargs['norm'] = norm
+        fftfun = self._module.ifftn if inverse else self._module.fftn
+        ret = fftfun(a, axes=axes, **kwargs)
+        if out is None:
+            return ret
+        out[...] = ret
+        return out
+
+    def _r2c(self, a, axes, norm, **kwargs):
+        kwargs = dict(self._kwargs, **kwargs)
+        if norm is not None:
+            kwargs['norm'] = norm
+        return self._module.rfftn(a, axes=axes, **kwargs)
+
+    def _transform(self, a, axes, norm, out, inverse, **kwargs):
+        a = np.asarray(a)
+        axes = _normaxes(axes, a.ndim)
+        if not np.isrealobj(a) or len(axes) == 0 or norm not in (None, 'ortho'):
+            return self._c2c(a, axes, norm, out, inverse, **kwargs)
+        half = self._r2c(a, axes, norm, **kwargs)
+        if inverse:
+            # ifftn(a) == conj(fftn(a)) / N for real a
+            if norm is None:
+                half /= np.prod([a.shape[i] for i in axes])
+            np.conjugate(half, out=half)
+        return _hermitian_expand(half, a.shape, axes, out=out)
+
+    def fftn(self, a, axes=None, norm=None, out=None, **kwargs):
+        return self._transform(a, axes, norm, out, False, **kwargs)
+
+    def ifftn(self, a, axes=None, norm=None, out=None, **kwargs):
+        return self._transform(a, axes, norm, out, True, **kwargs)
+
+    def fftshift(self, x, axes=None):
+        return np.fft.fftshift(x, axes=axes)
+
+    def fftfreq(self, n, d=1.0):
+        return np.fft.fftfreq(n, d)
+
+
+class ScipyBackend(NumpyBackend):
+    '''
+    FFTs using `scipy.fft`, which runs multidimensional transforms in `workers` threads.
+    '''
+    name = 'scipy'
+    _module = scipy_fft
+
+    def __init__(self, workers=None):
+        if scipy_fft is None:
+            raise ImportError('ScipyBackend requires scipy >= 1.4.')
+        self._kwargs = dict(workers=helper.nproc if workers is None else workers)
+
+
+class MKLBackend(NumpyBackend):
+    '''
+    FFTs using the Intel MKL through `mkl_fft`. The number of threads is controlled by MKL,
+    for example by the environment variable `MKL_NUM_THREADS`.
+    '''
+    name = 'mkl_fft'
+    _module = mkl_numpy_fft
+
+    def __init__(self):
+        if mkl_numpy_fft is None:
+            raise ImportError('MKLBackend requires mkl_fft.')
+
+
+class FFTWBackend(NumpyBackend):
+    '''
+    FFTs using planned `pyfftw.FFTW` objects.
+
+    A plan is created once for every combination of shape, dtype, axes and direction
+    and reused for all further transforms of that kind. As plans are created with
+    `planner_effort='FFTW_MEASURE'` by default, the first transform of a new shape is slow.
+    The accumulated FFTW wisdom is saved to `wisdomfile`, such that later sessions on the
+    same machine can create the same plans instantly. Use `wisdomfile=False` to disable this.
+    At most `maxplans` plans are kept.
+    '''
+    name = 'pyfftw'
+
+    def __init__(self, threads=None, planner_effort='FFTW_MEASURE', maxplans=16,
+                 wisdomfile=None):
+        if pyfftw is None:
+            raise ImportError('FFTWBackend requires pyfftw.')
+        self.threads = helper.nproc if threads is None else threads
+        self.planner_effort = planner_effort
+        self.maxplans = maxplans
+        self.wisdomfile = _cachefile('fftw-wisdom.json') if wisdomfile is None else wisdomfile
+        self._plans = collections.OrderedDict()
+        # a plan can only execute one transform at a time
+        self._lock = threading.Lock()
+        self._loadwisdom()
+
+    def _loadwisdom(self):
+        if not self.wisdomfile:
+            return
+        try:
+            with open(self.wisdomfile) as f:
+                pyfftw.import_wisdom(tuple(w.encode('latin-1') for w in json.load(f)))
+        except (IOError, OSError, ValueError, TypeError, AttributeError):
+            # no or invalid wisdom. Plans will be created from scratch.
+            pass
+
+    def _savewisdom(self):
+        if not self.wisdomfile:
+            return
+        # the wisdom is a tuple of byte strings containing text.
+        # Read only location: the wisdom will just not be kept for later sessions.
+        wisdom = [w.decode('latin-1') for w in pyfftw.export_wisdom()]
+        helper._atomicwrite(self.wisdomfile, lambda f: json.dump(wisdom, f))
+
+    def _plan(self, shape, dtype, outshape, outdtype, axes, inverse, threads, planner_effort,
+              inplace=False):
+        '''
+        returns the plan for the given transform, creating it if necessary.
+        '''
+        key = (shape, dtype.str, axes, inverse, threads, planner_effort, inplace)
+        plan = self._plans.pop(key, None)
+        if plan is None:
+            # FFTW_MEASURE overwrites the arrays while planning, so fresh buffers are used.
+            a = pyfftw.empty_aligned(shape, dtype=dtype)
+            b = a if inplace else pyfftw.empty_aligned(outshape, dtype=outdtype)
+            direction = 'FFTW_BACKWARD' if inverse else 'FFTW_FORWARD'
+            plan = pyfftw.FFTW(a, b, axes=axes, direction=direction,
+                               flags=(planner_effort,), threads=threads)
+            self._savewisdom()
+            while len(self._plans) >= self.maxplans:
+                self._plans.popitem(last=False)
+        self._plans[key] = plan
+        return plan
+
+    def _execute(self, a, outshape, outdtype, axes, norm, out, inverse,
+                 threads=None, planner_effort=None):
+        if norm not in (None, 'ortho'):
+            raise ValueError('The pyfftw backend supports norm=None and norm="ortho" only, '
+                             'not {!r}.'.format(norm))
+        # the plan expects aligned and contiguous arrays. Otherwise pyfftw would copy
+        # the input into the array of the previous transform.
+        a = np.ascontiguousarray(a)
+        if not pyfftw.is_byte_aligned(a):
+            a = pyfftw.byte_align(a)
+        threads = self.threads if threads is None else threads
+        planner_effort = self.planner_effort if planner_effort is None else planner_effort
+        ortho = norm == 'ortho'
+        target = out
+        if out is None or out.dtype != outdtype or not out.flags.c_contiguous \
+           or not pyfftw.is_byte_aligned(out):
+            target = pyfftw.empty_aligned(outshape, dtype=outdtype)
+        # an in-place transform needs its own plan, but saves the temporary output.
+        inplace = a is target and a.shape == outshape
+        if not inplace and np.may_share_memory(a, target):
+            target = pyfftw.empty_aligned(outshape, dtype=outdtype)
+        with self._lock:
+            plan = self._plan(a.shape, a.dtype, outshape, outdtype, axes, inverse,
+                              threads, planner_effort, inplace=inplace)
+            plan(a, target, normalise_idft=not ortho, ortho=ortho)
+        if out is None:
+            return target
+        if target is not out:
+            out[...] = target
+        return out
+
+    def _c2c(self, a, axes, norm, out, inverse, **kwargs):
+        a = np.asarray(a, dtype=np.result_type(a, np.complex64))
+        return self._execute(a, a.shape, a.dtype, axes, norm, out, inverse, **kwargs)
+
+    def _r2c(self, a, axes, norm, **kwargs):
+        a = np.asarray(a, dtype=np.result_type(a, np.float32))
+        outshape = list(a.shape)
+        outshape[axes[-1]] = outshape[axes[-1]] // 2 + 1
+        outdtype = np.result_type(a, np.complex64)
+        return self._execute(a, tuple(outshape), outdtype, axes, norm, None, False, **kwargs)
+
+
+_backends = collections.OrderedDict((cls.name, cls) for cls in
+                                    [NumpyBackend, ScipyBackend, FFTWBackend, MKLBackend])
+_backend = None
+
+
+def _available():
+    return [name for name, mod in [('numpy', np.fft), ('scipy', scipy_fft),
+                                   ('pyfftw', pyfftw), ('mkl_fft', mkl_numpy_fft)]
+            if mod is not None]
+
+
+def _benchmark(names, shape=(64, 64, 64), repeat=3):
+    '''
+    returns the name of the backend with the fastest complex transform of the given shape.
+    '''
+    a = np.random.random(shape) + 1j * np.random.random(shape)
+    times = dict()
+    for name in names:
+        backend = _backends[name]()
+        # the first transform may include planning
+        backend.fftn(a, norm='ortho')
+        t0 = time.time()
+        for _ in range(repeat):
+            backend.fftn(a, norm='ortho')
+        times[name] = time.time() - t0
+    return min(names, key=times.get)
+
+
+def _autobackend():
+    '''
+    the name of the fastest available backend. The benchmark is run once and its result
+    is stored in the user cache directory.
+    '''
+    names = _available()
+    if len(names) == 1:
+        return names[0]
+    cachefile = _cachefile('fft-backend.json')
+    setup = dict(available=names, nproc=helper.nproc)
+    try:
+        with open(cachefile) as f:
+            cache = json.load(f)
+        if cache['setup'] == setup and cache['backend'] in names:
+            return cache['backend']
+    except (IOError, OSError, ValueError, KeyError, TypeError):
+        pass
+    name = _benchmark(names)
+    helper._atomicwrite(cachefile, lambda f: json.dump(dict(setup=setup, backend=name), f))
+    return name
+
+
+def set_fft_backend(name='auto', **options):
+    '''
+    Chooses the FFT implementation used by `Field.fft` and returns the new backend.
+
+    `name` is one of
+
+    * 'numpy': `numpy.fft`.
+    * 'scipy': `scipy.fft`, option `workers` (default: number of cores).
+    * 'pyfftw': planned FFTW transforms, options `threads` (default: number of cores),
+      `planner_effort`, `maxplans` and `wisdomfile`.
+    * 'mkl_fft': the Intel MKL.
+    * 'auto': the fastest of the available backends. This runs a short benchmark once per
+      machine, stores its result in the user cache directory and takes no options.
+
+    Without calling this function, 'scipy' is used if available and 'numpy' otherwise.
+
+    Example: `postpic.set_fft_backend('scipy', workers=32)`
+    '''
+    global _backend
+    if name == 'auto':
+        if options:
+            raise TypeError('The backend "auto" takes no options.')
+        name = _autobackend()
+    if name not in _backends:
+        raise ValueError('Unknown FFT backend "{}". Valid names are {}.'
+                         .format(name, ['auto'] + list(_backends)))
+    _backend = _backends[name](**options)
+    return _backend
+
+
+def get_fft_backend():
+    '''
+    Returns the FFT backend in use. If none has been chosen with `set_fft_backend`,
+    this is 'scipy' if available and 'numpy' otherwise.
+    '''
+    if _backend is None:
+        return set_fft_backend('numpy' if scipy_fft is None else 'scipy')
+    return _backend
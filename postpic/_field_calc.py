@@ -21,6 +21,11 @@ Field related routines.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+
 import numpy as np
 from .helper import PhysicalConstants as pc
 from . import helper
@@ -29,6 +34,70 @@ import warnings
 
 __all__ = ['FieldAnalyzer']
 
+# maximum number of grid points read at once by `reduce`
+_reduce_slabsize = 2**24
+
+
+def _peraxis(value, n):
+    '''
+    returns a tuple of "n" ints. "value" is either a single int or one int per axis.
+    '''
+    if not isinstance(value, Iterable):
+        value = (value,) * n
+    value = tuple(int(v) for v in value)
+    if len(value) != n:
+        raise ValueError('Expected {} values (one per axis), got {}.'.format(n, len(value)))
+    if any(v < 1 for v in value):
+        raise ValueError('Values must be positive, got {}.'.format(value))
+    return value
+
+
+def _rangeslice(r):
+    '''
+    returns the slice, which selects the indices of the range "r".
+    '''
+    return slice(r.start, None if r.stop < 0 else r.stop, r.step)
+
+
+def _subaxis(ax, sl):
+    '''
+    like `ax[sl]`, but also supports slices with a step, which keep only
+    every n-th grid point.
+    '''
+    if sl.step == -1:
+        # `Axis` only supports the reversed full slice, so reverse the forward sub-axis
+        idx = range(*sl.indices(len(ax)))
+        return ax[idx[-1]:idx[0] + 1][::-1] if len(idx) > 0 else ax[sl]
+    if sl.step is None or sl.step == 1:
+        return ax[sl]
+    grid = ax.grid[sl]
+    if len(grid) == 1:
+        return ax[sl.start:sl.start + 1]
+    return Axis(ax.name, ax.unit, grid=grid)
+
+
+def _reducedaxis(ax, n):
+    '''
+    Axis with blocks of "n" grid cells merged into one. Like `Axis.half_resolution`,
+    the last grid points, which do not fill a whole block, are ignored.
+    '''
+    if n == 1:
+        return ax
+    m = len(ax) // n
+    grid = np.mean(np.reshape(ax.grid[:m * n], (m, n)), axis=1)
+    return Axis(ax.name, ax.unit, grid=grid, grid_node=ax.grid_node[:m * n + 1:n])
+
+
+def _blockmean(data, factors):
+    '''
+    averages "data" over blocks of "factors" points along each axis.
+    Points, which do not fill a whole block, are ignored.
+    '''
+    data = np.asarray(data)
+    sl = tuple(slice(0, n - n % f) for n, f in zip(data.shape, factors))
+    shape = [x for n, f in zip(data.shape, factors) for x in (n // f, f)]
+    return np.reshape(data[sl], shape).mean(axis=tuple(range(1, len(shape), 2)))
+
 
 class FieldAnalyzer(object):
     '''
@@ -56,15 +125,119 @@ class FieldAnalyzer(object):
         self.setgridtofield(ret, gridkey)
         return ret
 
-    def createfieldfromkey(self, key, gridkey=None):
+    def _subregion(self, gridkey, extent=None, slices=None, stride=None, dims=None):
+        '''
+        converts either "extent" or "slices" into a tuple of index slices on the grid
+        defined by "gridkey". If both are None, the full grid of "dims" dimensions
+        is selected. "stride" keeps only every n-th grid point along each axis.
+        Returns the tuple of slices and the list of the Axis objects
+        of the sub-region.
+        '''
+        if extent is not None and slices is not None:
+            raise ValueError('Only one of "extent" and "slices" may be given.')
+        if extent is not None:
+            axes = [self.getaxisobj(gridkey, i) for i in range(len(extent) // 2)]
+            slices = [ax._extent_to_slice(extent[2 * i:2 * i + 2])
+                      for i, ax in enumerate(axes)]
+        else:
+            if slices is None:
+                slices = (slice(None),) * dims
+            elif not isinstance(slices, Iterable):
+                slices = (slices,)
+            axes = [self.getaxisobj(gridkey, i) for i in range(len(slices))]
+            slices = [ax._normalize_slice(sl) for ax, sl in zip(axes, slices)]
+        if stride is not None:
+            stride = _peraxis(stride, len(slices))
+            slices = [slice(sl.start, sl.stop, (sl.step or 1) * st)
+                      if isinstance(sl, slice) else sl for sl, st in zip(slices, stride)]
+        # make start and stop explicit
+        slices = tuple(_rangeslice(range(*sl.indices(len(ax))))
+                       if isinstance(sl, slice) else sl for ax, sl in zip(axes, slices))
+        axes = [_subaxis(ax, sl) for ax, sl in zip(axes, slices) if isinstance(sl, slice)]
+        return slices, axes
+
+    def _partialreads(self):
+        '''
+        True, if sub-regions of the data can be read without loading all of it.
+        '''
+        return False
+
+    def _readreduced(self, datafunc, slices, factors, **kwargs):
+        '''
+        reads the data in slabs along the first sliced axis and averages blocks of
+        "factors" grid points while streaming. This way the data at full resolution
+        is never held in memory completely.
+        If the reader cannot read sub-regions (see `_partialreads`), the data is read
+        once and reduced in memory instead.
+        '''
+        ranges = [range(sl.start, -1 if sl.stop is None else sl.stop, sl.step)
+                  for sl in slices if isinstance(sl, slice)]
+        factors = [f for f, sl in zip(factors, slices) if isinstance(sl, slice)]
+        if len(ranges) == 0:
+            return datafunc(slices=slices, **kwargs)
+        if not self._partialreads():
+            # every slab would load all the data again
+            return _blockmean(datafunc(slices=slices, **kwargs), factors)
+        a = [isinstance(sl, slice) for sl in slices].index(True)
+        rowsize = int(np.prod([len(r) for r in ranges[1:]]))
+        blocks = max(1, _reduce_slabsize // (factors[0] * max(rowsize, 1)))
+        ret = np.empty([len(r) // f for r, f in zip(ranges, factors)])
+        for j in range(0, len(ret), blocks):
+            slab = list(slices)
+            slab[a] = _rangeslice(ranges[0][j * factors[0]:(j + blocks) * factors[0]])
+            ret[j:j + blocks] = _blockmean(datafunc(slices=tuple(slab), **kwargs), factors)
+        return ret
+
+    def _createfieldfromfunc(self, datafunc, gridkey, extent=None, slices=None,
+                             stride=None, reduce=None, **kwargs):
+        '''
+        creates a Field from the data returned by "datafunc(**kwargs)". If "extent"
+        or "slices" is given, it is forwarded to "datafunc" as index slices,
+        so only the sub-region has to be read. "stride" and "reduce"
+        lower the resolution while reading (see createfieldfromkey).
+        '''
+        if extent is None and slices is None and stride is None and reduce is None:
+            return self._createfieldfromdata(datafunc(**kwargs), gridkey)
+        dims = None
+        for val in (stride, reduce):
+            if isinstance(val, Iterable):
+                dims = len(val)
+        if dims is None and extent is None and slices is None:
+            dims = self.simdimensions()
+        slices, axes = self._subregion(gridkey, extent=extent, slices=slices,
+                                       stride=stride, dims=dims)
+        if reduce is None:
+            return Field(np.float64(datafunc(slices=slices, **kwargs)), axes=axes)
+        factors = _peraxis(reduce, len(slices))
+        data = self._readreduced(datafunc, slices, factors, **kwargs)
+        factors = [f for f, sl in zip(factors, slices) if isinstance(sl, slice)]
+        axes = [_reducedaxis(ax, f) for ax, f in zip(axes, factors)]
+        return Field(data, axes=axes)
+
+    def createfieldfromkey(self, key, gridkey=None, extent=None, slices=None,
+                           stride=None, reduce=None):
         '''
         This method creates a Field object from the data identified by "key".
         The Grid is also inferred from that key unless an alternate "gridkey"
         is provided.
+
+        Only a sub-region of the data is read, if either "extent"
+        (like in `Field.cutout`) or "slices" (like in `Field.__getitem__`) is given.
+        One extent pair or slice is needed per dimension.
+
+        For a quick look at large grids the resolution can be lowered while reading:
+        "stride" only reads every n-th grid point. "reduce" averages blocks
+        of n grid points (like repeated calls to `Field.half_resolution` do for n=2, 4, ...),
+        but reads the data in slabs. Both accept a single int or one int per axis.
         '''
         if gridkey is None:
             gridkey = key
-        ret = self._createfieldfromdata(self.data(key), gridkey)
+
+        def datafunc(slices=None):
+            return self._readdata(key, slices=slices)
+
+        ret = self._createfieldfromfunc(datafunc, gridkey, extent=extent, slices=slices,
+                                        stride=stride, reduce=reduce)
         ret.name = key
         return ret
 
@@ -111,50 +284,58 @@ class FieldAnalyzer(object):
         for key in keys:
             yield self.createfieldfromkey(key)
 
-    # most common fields listed here nicely
-    def Ex(self, **kwargs):
-        ret = self._createfieldfromdata(self._Ex(**kwargs),
-                                        self.gridkeyE('x', **kwargs))
+    # most common fields listed here nicely.
+    # "extent" or "slices" restrict the read to a sub-region and "stride" or "reduce"
+    # lower the resolution while reading (see createfieldfromkey).
+    def Ex(self, extent=None, slices=None, stride=None, reduce=None, **kwargs):
+        ret = self._createfieldfromfunc(self._Ex, self.gridkeyE('x', **kwargs),
+                                        extent=extent, slices=slices,
+                                        stride=stride, reduce=reduce, **kwargs)
         ret.unit = 'V/m'
         ret.name = 'Ex'
         ret.shortname = 'Ex'
         return ret
 
-    def Ey(self, **kwargs):
-        ret = self._createfieldfromdata(self._Ey(**kwargs),
-                                        self.gridkeyE('y', **kwargs))
+    def Ey(self, extent=None, slices=None, stride=None, reduce=None, **kwargs):
+        ret = self._createfieldfromfunc(self._Ey, self.gridkeyE('y', **kwargs),
+                                        extent=extent, slices=slices,
+                                        stride=stride, reduce=reduce, **kwargs)
         ret.unit = 'V/m'
         ret.name = 'Ey'
         ret.shortname = 'Ey'
         return ret
 
-    def Ez(self, **kwargs):
-        ret = self._createfieldfromdata(self._Ez(**kwargs),
-                                        self.gridkeyE('z', **kwargs))
+    def Ez(self, extent=None, slices=None, stride=None, reduce=None, **kwargs):
+        ret = self._createfieldfromfunc(self._Ez, self.gridkeyE('z', **kwargs),
+                                        extent=extent, slices=slices,
+                                        stride=stride, reduce=reduce, **kwargs)
         ret.unit = 'V/m'
         ret.name = 'Ez'
         ret.shortname = 'Ez'
         return ret
 
-    def Bx(self, **kwargs):
-        ret = self._createfieldfromdata(self._Bx(**kwargs),
-                                        self.gridkeyB('x', **kwargs))
+    def Bx(self, extent=None, slices=None, stride=None, reduce=None, **kwargs):
+        ret = self._createfieldfromfunc(self._Bx, self.gridkeyB('x', **kwargs),
+                                        extent=extent, slices=slices,
+                                        stride=stride, reduce=reduce, **kwargs)
         ret.unit = 'T'
         ret.name = 'Bx'
         ret.shortname = 'Bx'
         return ret
 
-    def By(self, **kwargs):
-        ret = self._createfieldfromdata(self._By(**kwargs),
-                                        self.gridkeyB('y', **kwargs))
+    def By(self, extent=None, slices=None, stride=None, reduce=None, **kwargs):
+        ret = self._createfieldfromfunc(self._By, self.gridkeyB('y', **kwargs),
+                                        extent=extent, slices=slices,
+                                        stride=stride, reduce=reduce, **kwargs)
         ret.unit = 'T'
         ret.name = 'By'
         ret.shortname = 'By'
         return ret
 
-    def Bz(self, **kwargs):
-        ret = self._createfieldfromdata(self._Bz(**kwargs),
-                                        self.gridkeyB('z', **kwargs))
+    def Bz(self, extent=None, slices=None, stride=None, reduce=None, **kwargs):
+        ret = self._createfieldfromfunc(self._Bz, self.gridkeyB('z', **kwargs),
+                                        extent=extent, slices=slices,
+                                        stride=stride, reduce=reduce, **kwargs)
         ret.unit = 'T'
         ret.name = 'Bz'
         ret.shortname = 'Bz'
@@ -243,6 +424,43 @@ class FieldAnalyzer(object):
 
         return self._kspace('Bz', fields, **kwargs)
 
+    def kspace_all(self, components=None, **kwargs):
+        '''
+        Reconstructs the physical k-space of several polarization components, by default
+        of all six. Returns a dict mapping the component names 'Ex', ..., 'Bz' to the Fields.
+
+        In contrast to calling `kspace_Ex()` ... `kspace_Bz()` one after another,
+        each of the necessary E and B components is read and Fourier transformed only once.
+        The keyword arguments are the same as for `kspace_Ex`. If `extent` is given,
+        the transforms are done after cutting and therefore once per component.
+        '''
+        if components is None:
+            components = ['Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz']
+        fields = dict()
+
+        def field(key):
+            if key not in fields:
+                fields[key] = getattr(self, key)()
+                if kwargs.get('extent') is None:
+                    fields[key] = fields[key].ensure_frequency_domain()
+            return fields[key]
+
+        ret = dict()
+        # the components share the k mesh and the dispersion relation
+        with helper._kspace_cachescope():
+            for component in components:
+                dimensions = field(component).dimensions
+                polaxis = helper.axesidentify[component[1]]
+                otherfield = 'B' if component[0] == 'E' else 'E'
+                # the components of the other field in the cross product, see `helper.kspace`
+                keys = [component]
+                for i in (1, 2):
+                    if (polaxis - i) % 3 < dimensions:
+                        keys.append(otherfield + 'xyz'[(polaxis + i) % 3])
+                ret[component] = self._kspace(component, {k: field(k) for k in keys},
+                                              **kwargs)
+        return ret
+
     def energydensityE(self, **kwargs):
         ret = self._createfieldfromdata(0.5 * pc.epsilon0 *
                                         (self._Ex(**kwargs) ** 2 +
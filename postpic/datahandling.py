@@ -52,6 +52,7 @@ except ImportError:
     from collections import Iterable, Mapping
 
 import copy
+import hashlib
 import warnings
 import os
 import numbers
@@ -66,6 +67,7 @@ import numexpr as ne
 from ._compat import tukey, meshgrid, broadcast_to, NDArrayOperatorsMixin
 from . import helper
 from . import io
+from . import _fft
 
 if sys.version[0] == '2':
     import functools32 as functools
@@ -78,36 +80,13 @@ else:
     from itertools import zip_longest
 
 
-try:
-    import psutil
-    nproc = psutil.cpu_count(logical=False)
-except ImportError:
-    try:
-        nproc = os.cpu_count()
-    except AttributeError:
-        import multiprocessing
-        nproc = multiprocessing.cpu_count()
+nproc = helper.nproc
 
 
 try:
-    # pyfftw is, in most situations, faster than numpys fft,
-    # although pyfftw will benefit from multithreading only on very large arrays
-    # on a 720x240x240 3D transform multithreading still doesn't give a large benefit
-    # benchmarks of a 720x240x240 transform of real data on a Intel(R) Xeon(R) CPU
-    # E5-1620 v4 @ 3.50GHz:
-    # numpy.fft: 3.6 seconds
-    # pyfftw, nproc=4: first transform 2.2s, further transforms 1.8s
-    # pyfftw, nproc=1: first transform 3.4s, further transforms 2.8s
-    # Try to import pyFFTW's numpy_fft interface
-    import pyfftw.interfaces.cache as fftw_cache
-    import pyfftw.interfaces.numpy_fft as fftw
-    fftw_cache.enable()
-    fft = fftw
-    fft_kwargs = dict(planner_effort='FFTW_ESTIMATE', threads=nproc)
+    import h5py
 except ImportError:
-    # pyFFTW is not available, just import numpys fft
-    import numpy.fft as fft
-    fft_kwargs = dict()
+    h5py = None
 
 
 try:
@@ -123,6 +102,169 @@ except ImportError:
 __all__ = ['KeepDim', 'Field', 'Axis']
 
 
+# number of elements processed at once by blockwise operations on out-of-core Fields.
+_outofcore_blocksize = 2**24
+
+# Reductions and elementwise operations on in-memory arrays with at least this
+# many elements are split into tiles, which are processed by `nproc` threads.
+_parallel_threshold = 2**22
+
+
+def _tilesize(size):
+    '''
+    the number of elements per tile, if an array of `size` elements is processed in parallel.
+    Returns `None` if the array should not be split.
+    '''
+    if size < _parallel_threshold or nproc is None or nproc < 2:
+        return None
+    return max(size // (4 * nproc), 1)
+
+
+class _SqueezedData(object):
+    '''
+    the out-of-core `data` without its length-1-dimensions, like `np.squeeze(data)`,
+    but without reading the data. Indexing reads only the requested region.
+    '''
+    def __init__(self, data):
+        self.data = data
+        self.dtype = data.dtype
+        self.shape = tuple(n for n in data.shape if n != 1)
+        self.ndim = len(self.shape)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def _fullslices(self, slices):
+        if not isinstance(slices, tuple):
+            slices = (slices,)
+        slices = iter(slices + (slice(None),) * (self.ndim - len(slices)))
+        return tuple(0 if n == 1 else next(slices) for n in self.data.shape)
+
+    def __getitem__(self, slices):
+        return _readblock(self.data, self._fullslices(slices))
+
+    def __array__(self, dtype=None):
+        return np.asarray(self[()], dtype=dtype)
+
+
+def _isoutofcore(matrix):
+    '''
+    True, if `matrix` is a `np.memmap` or a `h5py.Dataset`, thus data, which is not
+    (completely) held in memory.
+    '''
+    if isinstance(matrix, (np.memmap, _SqueezedData)):
+        return True
+    return h5py is not None and isinstance(matrix, h5py.Dataset)
+
+
+def _readblock(matrix, slices):
+    '''
+    returns `matrix[slices]`. Slices with negative steps are also supported
+    on h5py datasets.
+    '''
+    if h5py is not None and isinstance(matrix, h5py.Dataset):
+        hslab, post = helper._hyperslab(slices, matrix.shape)
+        return matrix[hslab][post]
+    return matrix[slices]
+
+
+def _blockwise(matrix, func, axes=(), combine=None, multiple=1, blocksize=None, threads=1):
+    '''
+    evaluates `func(block, sl)` on slabs `block = matrix[sl]` of `blocksize` elements
+    (default: `_outofcore_blocksize`) using `threads` threads.
+    `func` must reduce the `axes` of the block (without keepdims).
+
+    The slabs are cut along the first axis not in `axes` and the results are concatenated
+    along this axis. If all axes are reduced, the slabs are cut along the first axis and
+    the results of all slabs are combined by the binary function `combine`.
+    The number of points of the slabs along the cut axis is a multiple of `multiple`.
+    '''
+    shape = matrix.shape
+    free = [i for i in range(len(shape)) if i not in axes]
+    cut = free[0] if free else 0
+    rowsize = max(1, int(np.prod(shape)) // max(shape[cut], 1))
+    step = max((blocksize or _outofcore_blocksize) // rowsize, multiple)
+    step -= step % multiple
+    slices = []
+    for start in range(0, shape[cut], step):
+        sl = [slice(None)] * len(shape)
+        sl[cut] = slice(start, start + step)
+        slices.append(tuple(sl))
+    results = helper._threadmap(lambda sl: func(np.asarray(matrix[sl]), sl), slices,
+                                threads if len(slices) > 1 else 1)
+    if free:
+        # all axes before `cut` are reduced, so `cut` is the first axis of the results
+        return np.concatenate(results, axis=0)
+    return functools.reduce(combine, results)
+
+
+def _tiled_ufunc(ufunc, method, inputs, kwargs):
+    '''
+    evaluates `getattr(ufunc, method)(*inputs, **kwargs)`. Elementwise operations on
+    large arrays are split into tiles along the first axis, which are evaluated in parallel
+    threads. Numpy releases the GIL within the ufunc loops.
+    '''
+    call = getattr(ufunc, method)
+    if method != '__call__' or ufunc.nout != 1 or set(kwargs) - {'out'}:
+        return call(*inputs, **kwargs)
+    shape = np.broadcast(*inputs).shape
+    tilesize = _tilesize(int(np.prod(shape)))
+    if not tilesize or len(shape) == 0 or shape[0] < 2:
+        return call(*inputs, **kwargs)
+    out = kwargs.get('out')
+    if isinstance(out, tuple):
+        out = out[0]
+    if out is not None and any(x is not out and np.may_share_memory(x, out) for x in inputs):
+        # numpy resolves the overlap of `out` and an input only within a single call
+        return call(*inputs, **kwargs)
+    step = max(1, tilesize * shape[0] // int(np.prod(shape)))
+    starts = list(range(0, shape[0], step))
+
+    def tileinputs(start):
+        sl = slice(start, start + step)
+        # only inputs spanning the full first axis are cut. The others broadcast.
+        return [x[sl] if np.ndim(x) == len(shape) and np.shape(x)[0] != 1 else x
+                for x in inputs]
+
+    first = call(*tileinputs(0), out=None if out is None else out[:step])
+    if out is None:
+        out = np.empty(shape, dtype=first.dtype)
+        out[:step] = first
+    helper._threadmap(lambda start: call(*tileinputs(start), out=out[start:start + step]),
+                      starts[1:], nproc)
+    return out
+
+
+# how partial results of blockwise reductions over all axes can be combined
+_blockwise_combine = dict(sum=np.add, prod=np.multiply, max=np.maximum, min=np.minimum,
+                          any=np.logical_or, all=np.logical_and, mean=np.add)
+
+
+def _blockwise_method(matrix, method, axes, keepdims=None, blocksize=None, threads=1,
+                      **kwargs):
+    '''
+    evaluates the reducing ndarray `method` on `matrix` blockwise.
+    '''
+    ndim = len(matrix.shape)
+    axes = tuple(sorted(set(a % ndim for a in axes)))
+    allaxes = len(axes) == ndim
+    if allaxes and method not in _blockwise_combine:
+        # all slabs are needed at once. Nothing left to do but reading all the data.
+        ret = getattr(np.asarray(matrix), method)(axis=axes, **kwargs)
+    else:
+        # the mean over all axes is calculated from the sum
+        blockmethod = 'sum' if allaxes and method == 'mean' else method
+        ret = _blockwise(matrix, lambda block, sl: getattr(block, blockmethod)(axis=axes,
+                                                                               **kwargs),
+                         axes=axes, combine=_blockwise_combine.get(method),
+                         blocksize=blocksize, threads=threads)
+        if blockmethod != method:
+            ret = ret / np.prod(matrix.shape)
+    if keepdims:
+        ret = np.reshape(ret, [1 if i in axes else n for i, n in enumerate(matrix.shape)])
+    return ret
+
+
 class KeepDim(object):
     def __init__(self, value):
         self.value = value
@@ -178,45 +320,59 @@ class Axis(object):
         if len(kwargs) > 0:
             raise TypeError('got an unexpcted keyword argument "{}"'.format(kwargs))
 
+        self._linear = None
+        self._inv_map = None
+        self._digest = None
+
+        if self._grid_node is None and self._grid is None:
+            if self._extent is None or self._n is None:
+                # If we are here really nothing has been passed, like with the old version
+                # of this class
+                raise ValueError("Missing required arguments for Axis construction.")
+            # only extent and n have been passed. This is a linear axis, which is fully
+            # described by extent and n, so grid and grid_node are created on first access.
+            self._extent = tuple(np.asarray(self._extent, dtype=np.float64))
+            self._linear = True
+            return
+
         if self._grid_node is None:
-            if self._grid is None:
-                if self._extent is None or self._n is None:
-                    # If we are here really nothing has been passed, like with the old version
-                    # of this class
-                    raise ValueError("Missing required arguments for Axis construction.")
-                # only extent and n have been passed, use that to create a linear grid_node
-                self._grid_node = np.linspace(self._extent[0], self._extent[-1], self._n+1,
-                                              endpoint=True)
+            # grid has been passed, create grid_node from grid.
+            if len(self._grid) > 3 and helper._hasconstantspacing(self._grid):
+                # no spline needed for a linear grid
+                d = (self._grid[-1] - self._grid[0]) / (len(self._grid) - 1)
+                gn = np.linspace(self._grid[0] - d / 2, self._grid[-1] + d / 2,
+                                 len(self._grid) + 1)
+            elif len(self._grid) > 3:
+                grid_spline = scipy.interpolate.UnivariateSpline(np.arange(len(self._grid)),
+                                                                 self._grid, s=0)
+                gn_inner = grid_spline(np.arange(0.5, len(self._grid)-1))
+                gn = np.pad(gn_inner, 1, 'constant')
+                del grid_spline
             else:
-                # grid has been passed, create grid_node from grid.
-                if len(self._grid) > 3:
-                    grid_spline = scipy.interpolate.UnivariateSpline(np.arange(len(self._grid)),
-                                                                     self._grid, s=0)
-                    gn_inner = grid_spline(np.arange(0.5, len(self._grid)-1))
-                    gn = np.pad(gn_inner, 1, 'constant')
-                    del grid_spline
-                else:
-                    gn = np.convolve(self._grid, np.ones(2) / 2.0, mode='full')
-                if self._extent is not None:
-                    # extent has been passed, use this for the end points of grid_node
-                    if self._extent[0] >= self._grid[0] or self._extent[-1] <= self._grid[-1]:
-                        raise ValueError("Passed invalid extent.")
-                    gn[0] = self._extent[0]
-                    gn[-1] = self._extent[-1]
+                gn = np.convolve(self._grid, np.ones(2) / 2.0, mode='full')
+            if self._extent is not None:
+                # extent has been passed, use this for the end points of grid_node
+                if self._extent[0] >= self._grid[0] or self._extent[-1] <= self._grid[-1]:
+                    raise ValueError("Passed invalid extent.")
+                gn[0] = self._extent[0]
+                gn[-1] = self._extent[-1]
+            else:
+                # estimate end points of grid_node as in the old grid.setter
+                if len(self._grid) > 1:
+                    gn[0] = self._grid[0] + (self._grid[0] - gn[1])
+                    gn[-1] = self._grid[-1] + (self._grid[-1] - gn[-2])
                 else:
-                    # estimate end points of grid_node as in the old grid.setter
-                    if len(self._grid) > 1:
-                        gn[0] = self._grid[0] + (self._grid[0] - gn[1])
-                        gn[-1] = self._grid[-1] + (self._grid[-1] - gn[-2])
-                    else:
-                        gn[0] = self._grid[0] - 0.5
-                        gn[-1] = self._grid[0] + 0.5
-                self._grid_node = gn
+                    gn[0] = self._grid[0] - 0.5
+                    gn[-1] = self._grid[0] + 0.5
+            self._grid_node = gn
 
         # now we are garantueed to have a grid_node
         if self._grid is None:
             # create grid from grid_node like in the old grid.getter
-            if len(self._grid_node) > 3:
+            if len(self._grid_node) > 3 and helper._hasconstantspacing(self._grid_node):
+                self._grid = 0.5 * (self._grid_node[:-1] + self._grid_node[1:])
+                self._linear = True
+            elif len(self._grid_node) > 3:
                 node_spline = scipy.interpolate.UnivariateSpline(np.arange(-0.5,
                                                                            len(self._grid_node)-1),
                                                                  self._grid_node, s=0)
@@ -250,8 +406,36 @@ class Axis(object):
         elif self._n != len(self._grid):
             raise ValueError("Passed invalid value of n.")
 
-        self._linear = None
-        self._inv_map = None
+    @classmethod
+    def _trusted(cls, name, unit, grid=None, grid_node=None, extent=None, n=None, linear=None):
+        '''
+        creates an Axis from values known to be consistent, skipping all checks of `__init__`.
+        Either the immutable arrays `grid` and `grid_node` or `extent` and `n` of a linear
+        axis must be given.
+        '''
+        ax = cls.__new__(cls)
+        ax.name = name
+        ax.unit = unit
+        ax._grid = grid
+        ax._grid_node = grid_node
+        if grid_node is None:
+            ax._extent = tuple(np.asarray(extent, dtype=np.float64))
+            ax._n = n
+            linear = True
+        else:
+            ax._extent = (grid_node[0], grid_node[-1])
+            ax._n = len(grid)
+        ax._linear = linear
+        ax._inv_map = None
+        ax._digest = None
+        return ax
+
+    def _node(self, i):
+        '''
+        position of the `i`-th grid_node of a linear axis without creating grid_node.
+        '''
+        a, b = self._extent
+        return a + i * ((b - a) / self._n)
 
     def __getstate__(self):
         """
@@ -261,23 +445,55 @@ class Axis(object):
         state['_inv_map'] = None
         return state
 
+    def _fingerprint(self):
+        '''
+        a digest of `grid_node` and `grid`. As both are immutable, it is calculated only once.
+        A linear axis, whose grids have not been created yet, is described by extent and n.
+        '''
+        if getattr(self, '_digest', None) is None:
+            if self._grid_node is None:
+                self._digest = repr((self._n, self._extent)).encode()
+                return self._digest
+            h = hashlib.sha1(np.ascontiguousarray(self.grid_node, dtype=np.float64))
+            h.update(np.ascontiguousarray(self.grid, dtype=np.float64))
+            self._digest = h.digest()
+        return self._digest
+
     def __eq__(self, other):
         '''
-        equality test for axis
+        equality test for axis. Two axes are equal, if their `extent`, `grid_node` and `grid`
+        are close to each other. The common cases, identical objects or identical grids,
+        are decided without comparing all grid points.
         '''
+        if self is other:
+            return True
+        if not isinstance(other, Axis):
+            return NotImplemented
+        if len(self) != len(other):
+            return False
+        if self._fingerprint() == other._fingerprint():
+            return True
         testattribs = ['extent', 'grid_node', 'grid']
         for ta in testattribs:
             if not np.all(np.isclose(getattr(self, ta), getattr(other, ta))):
                 return False
         return True
 
+    def __ne__(self, other):
+        ret = self.__eq__(other)
+        return ret if ret is NotImplemented else not ret
+
+    # equal axes may have slightly different grids, so no hash can be consistent with the
+    # tolerance of `__eq__`. Use `id(axis)` or `(axis.name, len(axis), axis.extent)` as keys.
+    __hash__ = None
+
     def islinear(self, force=False):
         """
         Checks if the axis has a linear grid.
         """
         if len(self) < 3:
             return True
-        if self._linear is None or force:
+        if self._linear is None or (force and self._grid_node is not None):
             self._linear = helper.islinear(self._grid_node)
         return self._linear
 
@@ -287,16 +503,27 @@ class Axis(object):
 
     @property
     def grid_node(self):
+        if self._grid_node is None:
+            gn = np.linspace(self._extent[0], self._extent[-1], self._n + 1, endpoint=True)
+            gn.flags.writeable = False
+            self._grid_node = gn
         return self._grid_node
 
     @property
     def grid(self):
+        if self._grid is None:
+            gn = self.grid_node
+            grid = 0.5 * (gn[:-1] + gn[1:])
+            grid.flags.writeable = False
+            self._grid = grid
         return self._grid
 
     @property
     def spacing(self):
         if not self.islinear():
             raise TypeError('Grid must be linear to calculate gridspacing')
+        if self._grid_node is None:
+            return np.abs(self._extent[1] - self._extent[0]) / self._n
         return np.abs(self.grid_node[1] - self.grid_node[0])
 
     @property
@@ -377,10 +604,15 @@ class Axis(object):
         '''
         removes every second grid_node.
         '''
+        n = len(self) // 2
+        if self._grid_node is None:
+            return self._trusted(self.name, self.unit, extent=(self._extent[0], self._node(2 * n)),
+                                 n=n)
         grid_node = self.grid_node[::2]
         grid = 0.5 * (self.grid[:-1:2] + self.grid[1::2])
-        ret = type(self)(self.name, self.unit, grid=grid, grid_node=grid_node)
-        return ret
+        grid.flags.writeable = False
+        return self._trusted(self.name, self.unit, grid=grid, grid_node=grid_node,
+                             linear=self._linear or None)
 
     def _inside_domain(self, val):
         '''
@@ -396,9 +628,9 @@ class Axis(object):
         '''
         a, b = extent
         if a is None:
-            a = self._grid_node[0]
+            a = self.extent[0]
         if b is None:
-            b = self._grid_node[-1]
+            b = self.extent[-1]
 
         if not (self._inside_domain(a) or self._inside_domain(b)):
             s = 'The extent limits {} must at least overlap with the domain extent {}.'
@@ -453,8 +685,10 @@ class Axis(object):
         '''
         returns an reversed Axis object
         '''
-        ax = type(self)(self.name, self.unit, grid_node=self.grid_node[::-1], grid=self.grid[::-1])
-        return ax
+        if self._grid_node is None:
+            return self._trusted(self.name, self.unit, extent=self._extent[::-1], n=self._n)
+        return self._trusted(self.name, self.unit, grid=self.grid[::-1],
+                             grid_node=self.grid_node[::-1], linear=self._linear or None)
 
     def __getitem__(self, key):
         """
@@ -468,6 +702,18 @@ class Axis(object):
 
         if not (sl.step is None or np.abs(sl.step) == 1):
             raise ValueError("slice.step must be 1, -1 or None (but is {})".format(sl.step))
+        if sl.step != -1:
+            # the common case of a forward slice. Build the Axis from the known values
+            # without repeating the validation of `__init__`.
+            start, stop, _ = sl.indices(len(self))
+            if stop > start:
+                if self._grid_node is None:
+                    return self._trusted(self.name, self.unit,
+                                         extent=(self._node(start), self._node(stop)),
+                                         n=stop - start)
+                return self._trusted(self.name, self.unit, grid=self.grid[start:stop],
+                                     grid_node=self.grid_node[start:stop + 1],
+                                     linear=self._linear or None)
         grid = self.grid[sl]
         stop = sl.stop
         if stop is not None and stop > 0:
@@ -529,9 +775,19 @@ def _reducing_numpy_method(method):
         # None. Passing on `None` does not work because the default value is a special
         # object, see <https://docs.scipy.org/doc/numpy-1.13.0/reference/generated/
         # numpy.all.html#numpy.all>
-        if keepdims is not None:
-            kwargs['keepdims'] = keepdims
-        o = getattr(self.matrix, method)(axis=axis, out=real_out, **kwargs)
+        tilesize = None
+        if out is None and not self._outofcore and set(kwargs) <= {'dtype', 'ddof'}:
+            tilesize = _tilesize(np.size(self.matrix))
+        if self._outofcore and out is None:
+            o = _blockwise_method(self.matrix, method, axisiter, keepdims=keepdims, **kwargs)
+        elif tilesize:
+            # large array: reduce tiles in parallel
+            o = _blockwise_method(self.matrix, method, axisiter, keepdims=keepdims,
+                                  blocksize=tilesize, threads=nproc, **kwargs)
+        else:
+            if keepdims is not None:
+                kwargs['keepdims'] = keepdims
+            o = getattr(self.matrix, method)(axis=axis, out=real_out, **kwargs)
 
         # if an `out` argument was supplied, just return it
         if out:
@@ -559,6 +815,8 @@ class Field(NDArrayOperatorsMixin):
     provides any information that is necessary to plot _and_ annotate
     the plot.
 
+    For data larger than the memory, see `Field.from_dataset`.
+
     Create a Field object from scratch. The only required argument is `matrix` which
     contains the actual data.
 
@@ -582,6 +840,32 @@ class Field(NDArrayOperatorsMixin):
     def importfrom(cls, filename, **kwargs):
         return io.import_field(filename, **kwargs)
 
+    @classmethod
+    def from_dataset(cls, dataset, name='', unit='', **kwargs):
+        '''
+        Creates an out-of-core Field from a `numpy.memmap` or a `h5py.Dataset` for data
+        larger than the memory. All other arguments are the same as for `Field`.
+
+        The data is never read completely by `__getitem__`, `cutout`, the reducing methods
+        (`sum`, `mean`, `max`, ...), `integrate(method='fast')`, `half_resolution`,
+        `real`, `imag` and `angle`. These operate blockwise and only their results are
+        held in memory. All other operations read the data.
+
+        Passing such data to `Field` directly reads it into memory.
+        '''
+        if not _isoutofcore(dataset):
+            raise TypeError('dataset must be a numpy.memmap or a h5py.Dataset.')
+        # set up the Field like the constructor would, using data without memory.
+        ret = cls(np.broadcast_to(np.zeros((), dtype=dataset.dtype), dataset.shape),
+                  name=name, unit=unit, **kwargs)
+        if ret.shape == dataset.shape:
+            ret._matrix = dataset
+        elif ret.shape == ():
+            ret._matrix = np.squeeze(dataset)
+        else:
+            ret._matrix = _SqueezedData(dataset)
+        return ret
+
     def __init__(self, matrix, name='', unit='', **kwargs):
         if 'xedges' in kwargs or 'axes' in kwargs:
             # Some axes have been passed, let length-1-dimensions alone
@@ -623,7 +907,8 @@ class Field(NDArrayOperatorsMixin):
         # and it is True for axes which live in frequency domain
         # This assumes that fields are initially created in spatial domain.
         if 'axes_transform_state' in kwargs:
-            self.axes_transform_state = kwargs['axes_transform_state']
+            # copy the list, so the result of an operation does not share it with its inputs
+            self.axes_transform_state = list(kwargs['axes_transform_state'])
         else:
             self.axes_transform_state = [False] * len(self.shape)
 
@@ -631,7 +916,7 @@ class Field(NDArrayOperatorsMixin):
         # from before the last transform was executed, this is used to
         # recreate the correct axis interval upon inverse transform
         if 'transformed_axes_origins' in kwargs:
-            self.transformed_axes_origins = kwargs['transformed_axes_origins']
+            self.transformed_axes_origins = list(kwargs['transformed_axes_origins'])
         else:
             self.transformed_axes_origins = [None] * len(self.shape)
 
@@ -675,7 +960,8 @@ class Field(NDArrayOperatorsMixin):
         for k in ['infos', 'axes_transform_state', 'transformed_axes_origins', 'axes']:
             ret.__dict__[k] = copy.copy(self.__dict__[k])
         if deep:
-            ret.matrix = self.matrix.copy(order=order)
+            # a deep copy of out-of-core data is held in memory
+            ret.matrix = np.array(self.matrix, order=order)
         return ret
 
     # Stuff related with compatibility to Numpy's ufuncs starts here.
@@ -693,6 +979,14 @@ class Field(NDArrayOperatorsMixin):
         ats1 = self.axes_transform_state
         tao1 = self.transformed_axes_origins
 
+        if isinstance(other, Field) and len(other.axes) == len(axes1) \
+                and all(a is b for a, b in zip(other.axes, axes1)) \
+                and other.axes_transform_state == ats1 \
+                and other.transformed_axes_origins == tao1:
+            # fast path: both operands share the same Axis objects, e.g. operations on
+            # fields read from the same grid or results of previous operations.
+            return axes1, ats1, tao1
+
         # create short hands for the properties of other
         if not isinstance(other, Field):
             # if other is a plain array, fill everything with None
@@ -850,7 +1144,7 @@ class Field(NDArrayOperatorsMixin):
             elif isinstance(out, tuple):
                 kwargs['out'] = tuple(
                     x.matrix if isinstance(x, type(self)) else x for x in out)
-        result = getattr(ufunc, method)(*inputs, **kwargs)
+        result = _tiled_ufunc(ufunc, method, inputs, kwargs)
 
         # If out-argument set, return it. Unpack a one-tuple (important for binary inplace ops)
         if out:
@@ -975,9 +1269,13 @@ class Field(NDArrayOperatorsMixin):
             raise ValueError("Shape of old and new matrix must be identical")
         self._matrix = other
 
+    @property
+    def _outofcore(self):
+        return _isoutofcore(self._matrix)
+
     @property
     def shape(self):
-        return np.asarray(self).shape
+        return np.shape(self._matrix)
 
     @property
     def grid_nodes(self):
@@ -1041,15 +1339,24 @@ class Field(NDArrayOperatorsMixin):
 
     @property
     def real(self):
-        return self.replace_data(self.matrix.real)
+        return self._elementwise(np.real)
 
     @property
     def imag(self):
-        return self.replace_data(self.matrix.imag)
+        return self._elementwise(np.imag)
 
     @property
     def angle(self):
-        return self.replace_data(np.angle(self))
+        return self._elementwise(np.angle)
+
+    def _elementwise(self, func):
+        '''
+        returns a Field containing `func(self.matrix)`, evaluated blockwise on out-of-core
+        Fields.
+        '''
+        if self._outofcore:
+            return self.replace_data(_blockwise(self.matrix, lambda block, sl: func(block)))
+        return self.replace_data(func(self.matrix))
 
     def phase(self, do_unwrap_phase=True):
         '''
@@ -1086,6 +1393,10 @@ class Field(NDArrayOperatorsMixin):
 
         ```field.evaluate(expr)```
 
+        If `out` is a Field, the result is written into its matrix and `out` is returned.
+        This avoids allocating a new array for the result, for example by
+        `field.evaluate('field * 2', out=field)`.
+
         This method replicates some logic from NumExpr.necompiler.getArguments(), seems
         there is no way around it.
         """
@@ -1104,8 +1415,14 @@ class Field(NDArrayOperatorsMixin):
             # `local_dict`, because it is actually the `global_dict`.
             clear_local_dict = clear_local_dict and frame_globals is not local_dict
 
-            ret = self.replace_data(ne.evaluate(ex, local_dict=local_dict,
-                                                global_dict=global_dict, **kwargs))
+            out = kwargs.get('out')
+            if isinstance(out, Field):
+                kwargs['out'] = out.matrix
+                ne.evaluate(ex, local_dict=local_dict, global_dict=global_dict, **kwargs)
+                ret = out
+            else:
+                ret = self.replace_data(ne.evaluate(ex, local_dict=local_dict,
+                                                    global_dict=global_dict, **kwargs))
 
         finally:
             if clear_local_dict:
@@ -1201,13 +1518,20 @@ class Field(NDArrayOperatorsMixin):
         n = ret.matrix.ndim
         s1 = [slice(None), ] * n
         s2 = [slice(None), ] * n
-        # ignore last grid point if self.matrix.shape[axis] is odd
-        lastpt = ret.shape[axis] - ret.shape[axis] % 2
-        # Averaging over neighboring points
-        s1[axis] = slice(0, lastpt, 2)
-        s2[axis] = slice(1, lastpt, 2)
-        m = (ret.matrix[tuple(s1)] + ret.matrix[tuple(s2)]) / 2.0
-        ret._matrix = m
+
+        def halve(m, sl=None):
+            # ignore last grid point if m.shape[axis] is odd
+            lastpt = m.shape[axis] - m.shape[axis] % 2
+            # Averaging over neighboring points
+            s1[axis] = slice(0, lastpt, 2)
+            s2[axis] = slice(1, lastpt, 2)
+            return (m[tuple(s1)] + m[tuple(s2)]) / 2.0
+
+        if ret._outofcore:
+            # slabs along axis 0 must have an even number of points, if axis == 0
+            ret._matrix = _blockwise(ret.matrix, halve, multiple=2)
+        else:
+            ret._matrix = halve(ret.matrix)
         ret.setaxisobj(axis, ret.axes[axis].half_resolution())
 
         # This info is invalidated
@@ -1758,6 +2082,13 @@ class Field(NDArrayOperatorsMixin):
         on larger arrays. However for the time being, _integrate_constant is left as is to have a
         refernce for testing and comparison of speed.
         '''
+        if self._outofcore:
+            return self._integrate_fast_blockwise(axes)
+        tilesize = _tilesize(np.size(self.matrix))
+        if tilesize:
+            # large array: integrate tiles in parallel
+            return self._integrate_fast_blockwise(axes, blocksize=tilesize, threads=nproc)
+
         ret = copy.copy(self)
 
         # sort the unique set of axes by the number of grid points, in ascending order
@@ -1786,6 +2117,31 @@ class Field(NDArrayOperatorsMixin):
 
         return ret
 
+    def _integrate_fast_blockwise(self, axes, blocksize=None, threads=1):
+        '''
+        _integrate_fast for out-of-core Fields or in parallel tiles.
+        '''
+        axes = tuple(sorted(set(axes)))
+
+        def integrate_block(block, sl):
+            for axis in axes:
+                shape = [1] * block.ndim
+                shape[axis] = block.shape[axis]
+                dx = np.diff(self.axes[axis].grid_node)[sl[axis]].reshape(shape)
+                block = block * dx
+            return block.sum(axis=axes)
+
+        ret = copy.copy(self)
+        # an array like `_integrate_fast` returns, also if all axes are integrated
+        ret._matrix = np.asarray(_blockwise(self.matrix, integrate_block, axes=axes,
+                                            combine=np.add, blocksize=blocksize,
+                                            threads=threads))
+        for axis in reversed(axes):
+            del ret.axes[axis]
+            del ret.axes_transform_state[axis]
+            del ret.transformed_axes_origins[axis]
+        return ret
+
     def integrate(self, axes=None, method=scipy.integrate.simps):
         '''
         Calculates the definite integral along the given axes.
@@ -1938,6 +2294,7 @@ class Field(NDArrayOperatorsMixin):
             axes = (axes,)
 
         dx = {i: self.axes[i].spacing for i in axes}
+        fft = _fft.get_fft_backend()
         new_axes = {
             i: fft.fftshift(2*np.pi*fft.fftfreq(self.shape[i], dx[i]))
             for i in axes
@@ -1949,7 +2306,8 @@ class Field(NDArrayOperatorsMixin):
                 new_axes[i] += self.transformed_axes_origins[i] - new_axes[i][0]
         return new_axes
 
-    def fft(self, axes=None, exponential_signs='spatial', old_behaviour=False, **kwargs):
+    def fft(self, axes=None, exponential_signs='spatial', old_behaviour=False, out=None,
+            **kwargs):
         '''
         Performs Fourier transform on any number of axes.
 
@@ -1972,6 +2330,11 @@ class Field(NDArrayOperatorsMixin):
             Do not remove the linear phase present in the fft of data that lie on a grid
             that does not start at 0. Default is False.
 
+        out: numpy.ndarray
+            complex array of the shape of the field receiving the result, which then shares
+            its memory with `out`. Repeatedly transforming into the same `out` avoids
+            allocations of full size arrays. `out` may be the data of the field itself.
+
         **kwargs:
             keyword-arguments are passed to the underlying fft implementation.
         '''
@@ -2031,10 +2394,8 @@ class Field(NDArrayOperatorsMixin):
         # normalization factor ensuring Parseval's Theorem
         fftnorm = np.sqrt(V/Vk)
 
-        # compile fft arguments, starting from default arguments `fft_kwargs` ...
-        my_fft_args = fft_kwargs.copy()
-        # ... and adding the user supplied `kwargs`
-        my_fft_args.update(kwargs)
+        # compile fft arguments, starting from the user supplied `kwargs` ...
+        my_fft_args = dict(kwargs)
         # ... and also norm = 'ortho'
         my_fft_args['norm'] = 'ortho'
 
@@ -2047,27 +2408,41 @@ class Field(NDArrayOperatorsMixin):
             elif transform_state is True:
                 fftnorm *= np.sqrt(N)
 
-        # make a copy with complex type
-        # copy is made explicitly once, so that all further operations (except fft itself,
-        # see below) can be done in place
-        # this is faster than `ndarray.astype()`
-        ret = self.evaluate('self + 0j')
-
-        if exponential_signs == 'temporal':
-            ne.evaluate('conj(ret)', out=ret.matrix)
-
-        # apply phase to shift grid in output domain according to the new_axes
-        # old code: ret = ret._apply_linear_phase(output_origins)
-        exp_ikdx_expr, expr_dict = helper._linear_phase(ret, output_origins)
-        expr_dict['ret'] = ret
-        ne.evaluate('ret * ({})'.format(exp_ikdx_expr),
-                    local_dict=expr_dict,
-                    out=ret.matrix)
-
-        # Transforming...
+        fft = _fft.get_fft_backend()
         fftfun = {True: fft.ifftn, False: fft.fftn}[transform_state]
-        # numpys fft does not offer an in-place fft
-        ret.matrix = fftfun(ret.matrix, axes=axes, **my_fft_args)
+
+        # The phase applied before the transform shifts the output grid. If the shift is an
+        # integer number of output grid points, it is a roll of the transformed data and
+        # a constant phase. Real data then stays real and the backend only needs to compute
+        # half of the spectrum.
+        rolls = None
+        if np.isrealobj(self.matrix):
+            rolls = [-output_origins[i] * self.shape[i] * dx[i] / (2*np.pi) for i in axes]
+            if all(np.abs(m - np.round(m)) < 1e-6 for m in rolls):
+                rolls = [int(np.round(m)) for m in rolls]
+            else:
+                rolls = None
+
+        if rolls is not None:
+            ret = self.replace_data(fftfun(self.matrix, axes=axes, out=out, **my_fft_args))
+            if any(rolls):
+                ret.matrix[...] = np.roll(ret.matrix, rolls, axis=axes)
+            # the constant phase of the omitted multiplication
+            phi0 -= sum(output_origins[i] * input_origins[i] for i in axes)
+        else:
+            # make a copy with complex type and apply the phase, which shifts the grid in
+            # the output domain according to the new_axes, in a single pass.
+            # old code: ret = ret._apply_linear_phase(output_origins)
+            c, factors = helper._linear_phase_factors(self, output_origins)
+            ex = 'self'
+            if exponential_signs == 'temporal' and np.iscomplexobj(self.matrix):
+                ex = 'conj(self)'
+            local_dict = dict(factors, self=self, c=c)
+            ret = self.evaluate(' * '.join([ex, 'c'] + sorted(factors)), local_dict=local_dict,
+                                out=out)
+
+            # Transforming...
+            ret.matrix = fftfun(ret.matrix, axes=axes, out=out, **my_fft_args)
 
         for i in axes:
             if transform_state is False:
@@ -2087,17 +2462,16 @@ class Field(NDArrayOperatorsMixin):
 
         # remove phase that stems from the input grid not starting at 0
         # also removes global phase shift between both domains also to to grid origins not 0
-        # also applies fftnorm
+        # also applies fftnorm and the conjugation for temporal sign convention in one pass
         # old code: ret = ret._apply_linear_phase(negative_input_origins, phi0=phi0)
-        exp_ikdx_expr, expr_dict = helper._linear_phase(ret, negative_input_origins, phi0=phi0)
-        expr_dict['ret'] = ret
-        expr_dict['fftnorm'] = fftnorm
-        ne.evaluate('fftnorm * ret * ({})'.format(exp_ikdx_expr),
-                    local_dict=expr_dict,
-                    out=ret.matrix)
-
-        if exponential_signs == 'temporal':
-            ne.evaluate('conj(ret)', out=ret.matrix)
+        c, factors = helper._linear_phase_factors(ret, negative_input_origins, phi0=phi0)
+        c = c * fftnorm
+        if factors or c != 1 or exponential_signs == 'temporal':
+            local_dict = dict(factors, ret=ret.matrix, c=c)
+            ex = ' * '.join(['ret', 'c'] + sorted(factors))
+            if exponential_signs == 'temporal':
+                ex = 'conj({})'.format(ex)
+            ne.evaluate(ex, local_dict=local_dict, out=ret.matrix)
 
         return ret
 
@@ -2142,11 +2516,10 @@ class Field(NDArrayOperatorsMixin):
                              "are in same transform state")
 
         # exp_ikdx = helper.linear_phase(self, dx)
-        exp_ikdx_expr, expr_dict = helper._linear_phase(self, dx, phi0=phi0)
-        expr_dict['self'] = self
+        c, factors = helper._linear_phase_factors(self, dx, phi0=phi0)
+        local_dict = dict(factors, self=self, c=c)
 
-        ret = self.evaluate('self * ({})'.format(exp_ikdx_expr),
-                            local_dict=expr_dict)
+        ret = self.evaluate(' * '.join(['self', 'c'] + sorted(factors)), local_dict=local_dict)
 
         return ret
 
@@ -2335,7 +2708,7 @@ class Field(NDArrayOperatorsMixin):
                 retained_axes.remove(i)
 
         ret = copy.copy(self)
-        ret._matrix = ret.matrix[slices]
+        ret._matrix = _readblock(ret.matrix, slices)
 
         ret.axes = [ret.axes[i] for i in retained_axes]
         for i, ax in enumerate(new_axes):
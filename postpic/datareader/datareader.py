@@ -18,9 +18,14 @@
 # Alexander Blinne, 2017
 
 from __future__ import absolute_import, division, print_function, unicode_literals
-from future.utils import with_metaclass
+from future.utils import with_metaclass, raise_from
 
 import abc
+import collections
+import functools
+import json
+import os
+import sys
 
 try:
     from collections.abc import Sequence
@@ -31,9 +36,107 @@ import warnings
 import numpy as np
 from .. import helper
 from .._field_calc import FieldAnalyzer
+from ..datahandling import Field, Axis
 
 __all__ = ['Dumpreader_ifc', 'Simulationreader_ifc']
 
+_fieldnames = ['Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz']
+
+
+def _imap(func, iterable, workers=1, backend='thread', ahead=None):
+    '''
+    Like `map(func, iterable)`, but evaluated on a pool of `workers` threads
+    (backend='thread') or processes (backend='process'). The results are yielded
+    in order as soon as they are available. Only `ahead` tasks (default: 2 * workers)
+    are submitted ahead of the result consumed last,
+    so the results do not pile up in memory.
+    With `workers=1` and no `ahead` given, `func` is evaluated in the calling thread.
+    '''
+    if backend not in ['thread', 'process']:
+        raise ValueError('backend must be "thread" or "process", not "{}".'.format(backend))
+    if workers == 1 and ahead is None:
+        for x in iterable:
+            yield func(x)
+        return
+    if not helper.have_concurrent_futures:
+        import multiprocessing.pool
+        pool = multiprocessing.pool.ThreadPool(workers) if backend == 'thread' \
+            else multiprocessing.Pool(workers)
+        try:
+            for ret in pool.imap(func, iterable):
+                yield ret
+        finally:
+            pool.terminate()
+        return
+    import concurrent.futures
+    if backend == 'thread':
+        executor = concurrent.futures.ThreadPoolExecutor(workers)
+    else:
+        executor = concurrent.futures.ProcessPoolExecutor(workers)
+    import multiprocessing
+    window = ahead if ahead else 2 * (workers or multiprocessing.cpu_count())
+    pending = collections.deque()
+    try:
+        for x in iterable:
+            pending.append(executor.submit(func, x))
+            # keep `window` tasks running while the consumer holds the current result
+            if len(pending) > window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown()
+
+
+def _calldump(args):
+    '''
+    evaluates `func(sr[n])` for `args = (sr, n, func)`. This opens the dump inside
+    the worker. Returns `(True, result)` or `(False, exception)`.
+    '''
+    sr, n, func = args
+    try:
+        return True, func(sr[n])
+    except Exception as e:
+        return False, e
+
+
+def _withtime(func, dr):
+    '''
+    returns `(dr.time(), func(dr))`, so the time is read while the dump is open anyway.
+    '''
+    return dr.time(), func(dr)
+
+
+def _indexentry(dr):
+    '''
+    the information about the dump `dr` stored in the dump index.
+    '''
+    entry = dict(step=int(dr.timestep()), time=float(dr.time()))
+    try:
+        entry['species'] = [str(s) for s in dr.listSpecies()]
+    except Exception:
+        entry['species'] = None
+    try:
+        entry['gridshape'] = [int(dr.simgridpoints(axis))
+                              for axis in range(dr.simdimensions())]
+    except Exception:
+        entry['gridshape'] = None
+    return entry
+
+
+def _filestamp(filename):
+    st = os.stat(filename)
+    return dict(mtime=st.st_mtime, size=st.st_size)
+
+
+def _printprogress(done, total):
+    sys.stderr.write('\r{:d}/{:d} dumps'.format(done, total))
+    if done == total:
+        sys.stderr.write('\n')
+    sys.stderr.flush()
+
 
 class Dumpreader_ifc(with_metaclass(abc.ABCMeta, FieldAnalyzer)):
     '''
@@ -86,6 +189,8 @@ class Dumpreader_ifc(with_metaclass(abc.ABCMeta, FieldAnalyzer)):
         super(Dumpreader_ifc, self).__init__()
         self.dumpidentifier = dumpidentifier
         self._name = name
+        # data read ahead of time by `prefetch`
+        self._prefetched = dict()
 
 # --- Level 0 methods ---
 
@@ -114,6 +219,21 @@ class Dumpreader_ifc(with_metaclass(abc.ABCMeta, FieldAnalyzer)):
         '''
         pass
 
+    def dataslice(self, key, slices):
+        '''
+        returns only the part `data(key)[slices]` of the data. `slices` is a tuple
+        containing a slice or an integer index for every axis.
+        Override this method, if the reader is able to read parts of the data
+        without loading all of it.
+        '''
+        return self.data(key)[tuple(slices)]
+
+    def _partialreads(self):
+        # only readers overriding `dataslice` can read sub-regions
+        dataslice = getattr(type(self).dataslice, '__func__', type(self).dataslice)
+        return dataslice is not getattr(Dumpreader_ifc.dataslice, '__func__',
+                                        Dumpreader_ifc.dataslice)
+
     @abc.abstractmethod
     def gridoffset(self, key, axis):
         '''
@@ -192,14 +312,14 @@ class Dumpreader_ifc(with_metaclass(abc.ABCMeta, FieldAnalyzer)):
 
     # if you need to customize more, just skip _key[E,B] methods and
     # override the following 4 methods to have full control.
-    def dataE(self, component, **kwargs):
-        return np.float64(self.data(self._keyE(component, **kwargs)))
+    def dataE(self, component, slices=None, **kwargs):
+        return np.float64(self._readdata(self._keyE(component, **kwargs), slices=slices))
 
     def gridkeyE(self, component, **kwargs):
         return self._keyE(component, **kwargs)
 
-    def dataB(self, component, **kwargs):
-        return np.float64(self.data(self._keyB(component, **kwargs)))
+    def dataB(self, component, slices=None, **kwargs):
+        return np.float64(self._readdata(self._keyB(component, **kwargs), slices=slices))
 
     def gridkeyB(self, component, **kwargs):
         return self._keyB(component, **kwargs)
@@ -259,6 +379,54 @@ class Dumpreader_ifc(with_metaclass(abc.ABCMeta, FieldAnalyzer)):
         '''
         pass
 
+    # --- Prefetching ---
+    def prefetch(self, keys):
+        '''
+        reads the data of all `keys` now and keeps it in memory, such that later requests
+        are answered without reading from disk. Items of `keys` may be data keys
+        (see `data`), the field names 'Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz' or
+        `(species, attrib)` tuples (see `getSpecies`). Keys, which are not
+        present in this dump, are ignored.
+
+        Returns:
+          self
+        '''
+        for key in keys:
+            try:
+                if isinstance(key, tuple):
+                    species, attrib = key
+                    self._prefetched[(species, helper.attribidentify[attrib])] = \
+                        self.getSpecies(species, attrib)
+                elif key in _fieldnames:
+                    keyfunc = self._keyE if key[0] == 'E' else self._keyB
+                    datakey = keyfunc(key[1])
+                    self._prefetched[datakey] = self.data(datakey)
+                else:
+                    self._prefetched[key] = self.data(key)
+            except(KeyError):
+                pass
+        return self
+
+    def _readdata(self, key, slices=None):
+        '''
+        like `data(key)` or `dataslice(key, slices)`, but uses prefetched data if available.
+        '''
+        if key in self._prefetched:
+            ret = self._prefetched[key]
+            return ret if slices is None else ret[tuple(slices)]
+        if slices is None:
+            return self.data(key)
+        return self.dataslice(key, slices)
+
+    def _readspecies(self, species, attrib):
+        '''
+        like `getSpecies(species, attrib)`, but uses prefetched data if available.
+        '''
+        try:
+            return self._prefetched[(species, helper.attribidentify[attrib])]
+        except(KeyError):
+            return self.getSpecies(species, attrib)
+
     @property
     def name(self):
         if self._name:
@@ -323,6 +491,7 @@ class Simulationreader_ifc(Sequence):
     def __init__(self, simidentifier, name=None):
         self.simidentifier = simidentifier
         self._name = name
+        self._dumpindex = None
 
     def __getitem__(self, key):
         if isinstance(key, slice):
@@ -363,7 +532,238 @@ class Simulationreader_ifc(Sequence):
         s = '<Simulationreader initialized with "{:}" ({:} dumps)'
         return s.format(self.simidentifier, len(self))
 
+    # --- The dump index ---
+    # filename of the dump index cache in the directory of the simulation data.
+    _dumpindexfilename = '.postpic-dumpindex.json'
+
+    def _dumpsource(self, n):
+        '''
+        returns `(filename, tag)` identifying dump `n` within the file `filename`
+        (`tag` is needed if a file contains multiple dumps). Cached entries of
+        the dump index are only valid as long as this file does not change.
+        Returns `None` if the dump is not stored in a single file.
+        Override in your own reader class to enable the cache on disk.
+        '''
+        return None
+
+    def _dumpindexfile(self):
+        '''
+        the filename of the dump index cache or `None` to keep it in memory only.
+        '''
+        return None
+
+    def _loaddumpindex(self):
+        indexfile = self._dumpindexfile()
+        if indexfile is None:
+            return {}
+        try:
+            with open(indexfile) as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _savedumpindex(self, cache):
+        indexfile = self._dumpindexfile()
+        if indexfile is None:
+            return
+        # in a read only location the index will just not be cached on disk.
+        helper._atomicwrite(indexfile, lambda f: json.dump(cache, f, indent=1, sort_keys=True))
+
+    def dumpindex(self, workers=1, cache=False):
+        '''
+        Returns a list containing a dict for each dump with its `step`, `time`,
+        `species` and `gridshape` (number of grid points of the simulation).
+
+        The index is built once by opening every dump and kept in memory.
+        With `cache=True` and if supported by the reader, it is also saved on disk in
+        `.postpic-dumpindex.json` next to the simulation data. An index saved like this
+        is always read, such that later sessions only need to open dumps, which were
+        modified or added since.
+        `workers` is forwarded to `map` to build the index.
+        '''
+        if self._dumpindex is not None and not cache:
+            return self._dumpindex
+        diskcache = self._loaddumpindex()
+        indexdir = os.path.dirname(self._dumpindexfile() or '')
+        keys = [None] * len(self)
+        entries = [None] * len(self)
+        for n in range(len(self)):
+            source = self._dumpsource(n)
+            if source is None:
+                continue
+            filename, tag = source
+            keys[n] = os.path.relpath(filename, indexdir or os.curdir)
+            if tag != '':
+                keys[n] += ':' + str(tag)
+            entry = diskcache.get(keys[n])
+            if entry is not None and all(entry.get(k) == v for k, v in
+                                         _filestamp(filename).items()):
+                entries[n] = entry
+        missing = [n for n, entry in enumerate(entries) if entry is None]
+        if missing:
+            if self._dumpindex is not None:
+                # known from before, only saving it was requested
+                newentries = (dict(self._dumpindex[n]) for n in missing)
+            else:
+                newentries = _SubSimulation(self, missing).map(_indexentry, workers=workers)
+            for n, entry in zip(missing, newentries):
+                if keys[n] is not None:
+                    entry.update(_filestamp(self._dumpsource(n)[0]))
+                    diskcache[keys[n]] = entry
+                entries[n] = entry
+        if cache and any(key is not None for key in keys):
+            self._savedumpindex(diskcache)
+        self._dumpindex = entries
+        return entries
+
+    def at_time(self, t):
+        '''
+        returns the dumpreader of the dump closest to time `t`, using the `dumpindex`.
+        '''
+        return self[int(np.argmin(np.abs(self._indextimes() - t)))]
+
+    def between(self, t0, t1):
+        '''
+        returns a list of the dumpreaders of all dumps with `t0 <= time <= t1`,
+        using the `dumpindex`.
+        '''
+        times = self._indextimes()
+        return [self[int(n)] for n in np.nonzero((times >= t0) & (times <= t1))[0]]
+
     # Higher Level Functions for usability
 
+    def map(self, func, workers=1, backend='thread', onerror='raise', progress=False):
+        '''
+        Evaluates `func(dumpreader)` for every dump of this simulation and yields the
+        results in order. Every dump is opened inside the worker evaluating it.
+
+        Args:
+          func : callable
+            called with a single dumpreader.
+          workers : int or None
+            number of threads or processes. `None` chooses one per processing unit.
+            With `workers=1` (default) all dumps are evaluated in the calling thread.
+          backend : 'thread' or 'process'
+            Threads work best for functions spending their time reading data.
+            Processes help if `func` holds the GIL, but `func` and this
+            simulationreader need to be picklable (define `func` on module level).
+          onerror : 'raise', 'warn' or 'return'
+            What to do if `func` fails on a dump: 'raise' a RuntimeError naming the dump,
+            'warn' about it and yield `None` or 'return' the exception object
+            instead of the result.
+          progress : bool or callable
+            if True, the number of evaluated dumps is printed to stderr. A callable
+            is called as `progress(done, total)` after every dump.
+
+        Example:
+          >>> energies = np.array(list(sr.map(lambda dr: dr.Ex().integrate(), workers=4)))
+        '''
+        if onerror not in ['raise', 'warn', 'return']:
+            raise ValueError('onerror must be "raise", "warn" or "return".')
+        if progress is True:
+            progress = _printprogress
+        total = len(self)
+        tasks = ((self, n, func) for n in range(total))
+        results = _imap(_calldump, tasks, workers=workers, backend=backend)
+        for n, (success, ret) in enumerate(results):
+            if progress:
+                progress(n + 1, total)
+            if not success:
+                msg = 'Evaluation on dump {:d} of "{}" failed: {!r}'.format(n, self.name, ret)
+                if onerror == 'raise':
+                    results.close()
+                    raise_from(RuntimeError(msg), ret)
+                elif onerror == 'warn':
+                    warnings.warn(msg)
+                    ret = None
+            yield ret
+
+    def prefetch(self, depth=2, keys=()):
+        '''
+        Iterates over all dumps like `for dr in sr`, but a background thread opens
+        the next `depth` dumps ahead of time and reads the data of `keys` (see
+        `Dumpreader_ifc.prefetch`). Thus reading the next dumps overlaps with the
+        analysis of the current one.
+
+        Example:
+          >>> for dr in sr.prefetch(keys=['Ey', ('electron', 'x')]):
+          ...     analyze(dr)
+        '''
+        keys = list(keys)
+
+        def load(n):
+            return self[n].prefetch(keys)
+        return _imap(load, range(len(self)), ahead=depth)
+
+    def stack(self, func, out=None, workers=1, backend='thread'):
+        '''
+        Evaluates `func(dumpreader)` for every dump and stacks the returned Fields
+        (or scalars) into a single Field with a new first axis "t" holding `times()`.
+
+        The results are written into the output one dump at a time, so only the
+        stacked result is held in memory.
+
+        Args:
+          func : callable
+            called with a single dumpreader. Must return Fields of equal shape or scalars.
+          out : numpy.ndarray
+            an array of shape `(len(self),) + field.shape` receiving the stacked data,
+            for example a `np.memmap` if the result exceeds the memory.
+            By default a new array is allocated.
+          workers, backend :
+            see `map`.
+
+        Example:
+          >>> streak = sr.stack(lambda dr: dr.Ey()[:, 0.0], workers=4)
+        '''
+        results = self.map(functools.partial(_withtime, func), workers=workers,
+                           backend=backend)
+        times = np.empty(len(self))
+        times[0], first = next(results)
+        if not isinstance(first, Field):
+            first = Field(np.asarray(first))
+        shape = (len(self),) + first.shape
+        if out is None:
+            out = np.empty(shape, dtype=first.matrix.dtype)
+        elif out.shape != shape:
+            raise ValueError('out has shape {}, but shape {} is needed.'.format(out.shape, shape))
+        out[0] = first.matrix
+        for n, (time, result) in enumerate(results, 1):
+            times[n] = time
+            out[n] = np.asarray(result)
+        taxis = Axis(name='t', unit='s', grid=times)
+        # a memmap stays out-of-core
+        field = Field.from_dataset if isinstance(out, np.memmap) else Field
+        ret = field(out, name=first.name, unit=first.unit, axes=[taxis] + first.axes,
+                    axes_transform_state=[False] + first.axes_transform_state,
+                    transformed_axes_origins=[None] + first.transformed_axes_origins)
+        return ret
+
+    def _indextimes(self):
+        return np.array([entry['time'] for entry in self.dumpindex()])
+
     def times(self):
+        '''
+        the times of all dumps. Only the time is read from every dump,
+        unless the `dumpindex` is already known.
+        '''
+        if self._dumpindex is not None:
+            return self._indextimes()
         return np.array([s.time() for s in self])
+
+
+class _SubSimulation(Simulationreader_ifc):
+    '''
+    the dumps `numbers` of the simulationreader `sr`.
+    '''
+
+    def __init__(self, sr, numbers):
+        super(_SubSimulation, self).__init__(sr.simidentifier, name=sr.name)
+        self._sr = sr
+        self._numbers = numbers
+
+    def _getDumpreader(self, n):
+        return self._sr[self._numbers[n]]
+
+    def __len__(self):
+        return len(self._numbers)
@@ -254,5 +254,13 @@ class Visitreader(Simulationreader_ifc):
     def _getDumpreader(self, index):
         return self.dumpreadercls(self._dumpfiles[index])
 
+    def _dumpsource(self, index):
+        return self._dumpfiles[index], ''
+
+    def _dumpindexfile(self):
+        import os.path
+        path = os.path.dirname(os.path.abspath(self.visitfile))
+        return os.path.join(path, self._dumpindexfilename)
+
     def __repr__(self):
         return '<Visitreader at "{:}" ({:} dumps)>'.format(self.visitfile, len(self))
@@ -31,30 +31,100 @@ from . import Dumpreader_ifc
 from . import Simulationreader_ifc
 import numpy as np
 import re
+import itertools
+import threading
+import zlib
 from .. import helper
 
 __all__ = ['OpenPMDreader', 'FileSeries']
 
 
+def _iterations(h5):
+    '''
+    returns the sorted list of all iterations contained in the open hdf5 file `h5`.
+    '''
+    return sorted(int(k) for k in h5['data'].keys())
+
+
+def _chunkslices(dataset):
+    '''
+    returns a list of tuples of slices, one for every chunk of the chunked `dataset`.
+    '''
+    ranges = [[slice(start, min(start + c, n)) for start in range(0, n, c)]
+              for n, c in zip(dataset.shape, dataset.chunks)]
+    return list(itertools.product(*ranges))
+
+
+def _read_chunks_parallel(dataset, out, threads=None):
+    '''
+    Reads the chunked `dataset` into the preallocated array `out` by
+    distributing the chunks on a pool of `threads` threads.
+
+    If gzip is the only filter of the dataset, the chunks are read raw and
+    decompressed by zlib, which releases the GIL. Thus the decompression
+    really runs in parallel. For any other dataset, every chunk
+    is read by h5py in its own thread, which only runs in parallel if
+    h5py and hdf5 were built to release the GIL.
+    '''
+    rawgzip = dataset.compression == 'gzip' \
+        and dataset.id.get_create_plist().get_nfilters() == 1
+
+    def readchunk(sl):
+        if rawgzip:
+            try:
+                filtermask, raw = dataset.id.read_direct_chunk(tuple(s.start for s in sl))
+            except(RuntimeError):
+                # chunk not allocated, let hdf5 fill in the fillvalue.
+                pass
+            else:
+                # bit 0 set means, the deflate filter was skipped for this chunk
+                buf = raw if filtermask & 1 else zlib.decompress(raw)
+                chunk = np.frombuffer(buf, dtype=dataset.dtype).reshape(dataset.chunks)
+                out[sl] = chunk[tuple(slice(0, s.stop - s.start) for s in sl)]
+                return
+        dataset.read_direct(out, source_sel=sl, dest_sel=sl)
+
+    helper._threadmap(readchunk, _chunkslices(dataset), threads)
+
+
 class OpenPMDreader(Dumpreader_ifc):
     '''
     The Reader implementation for Data written in the hdf5 file
     format following openPMD_ naming conventions.
 
     Args:
-      h5file : String
-        A String containing the relative Path to the .h5 file.
+      h5file : String or h5py.File
+        A String containing the relative Path to the .h5 file or an already opened
+        h5py.File object. Passing an open file avoids reopening large files,
+        if many iterations are read from the same file.
+      iteration : int
+        The iteration to read. This is only needed for files containing more than a
+        single iteration (`iterationEncoding=groupBased`). Defaults to the first
+        iteration found in the file.
+      threads : int
+        Number of threads used to read and decompress the chunks of chunked datasets.
+        `None` chooses one thread per available processing unit. Default: 1
     '''
 
-    def __init__(self, h5file, **kwargs):
-        super(self.__class__, self).__init__(h5file, **kwargs)
+    def __init__(self, h5file, iteration=None, threads=1, **kwargs):
         import os.path
         import h5py
-        if not os.path.isfile(h5file):
+        if isinstance(h5file, h5py.File):
+            self._h5 = h5file
+            h5file = h5file.filename
+        elif not os.path.isfile(h5file):
             raise IOError('File "' + str(h5file) + '" doesnt exist.')
-        self._h5 = h5py.File(h5file, 'r')
-        self._iteration = int(list(self._h5['data'].keys())[0])
-        self._data = self._h5['/data/{:d}/'.format(self._iteration)]
+        else:
+            self._h5 = h5py.File(h5file, 'r')
+        super(self.__class__, self).__init__(h5file, **kwargs)
+        if iteration is None:
+            iteration = _iterations(self._h5)[0]
+        self._iteration = int(iteration)
+        self._threads = threads
+        try:
+            self._data = self._h5['/data/{:d}/'.format(self._iteration)]
+        except(KeyError):
+            raise KeyError('Iteration {:d} not found in "{}".'.format(self._iteration, h5file))
         self.attrs = self._data.attrs
 
     def __del__(self):
@@ -78,14 +148,41 @@ class OpenPMDreader(Dumpreader_ifc):
         a numpy array containing a single value only.
         '''
         record = self[key]
+        unitSI = record.attrs['unitSI']
         if "value" in record.attrs:
             # constant data (a single int or float)
-            ret = np.float64(record.attrs['value']) * record.attrs['unitSI']
+            ret = np.float64(record.attrs['value']) * unitSI
         else:
-            # array data
-            ret = np.float64(record.value) * record.attrs['unitSI']
+            # array data. Let hdf5 convert to float64 while reading into the buffer
+            # and apply unitSI in place. This avoids any temporary copies.
+            ret = np.empty(record.shape, dtype=np.float64)
+            if ret.size == 0:
+                pass
+            elif self._threads != 1 and record.chunks is not None:
+                _read_chunks_parallel(record, ret, threads=self._threads)
+            else:
+                record.read_direct(ret)
+            if unitSI != 1.0:
+                ret *= unitSI
         return ret
 
+    def dataslice(self, key, slices):
+        '''
+        reads only the hyperslab given by `slices` from the hdf5 file.
+        '''
+        record = self[key]
+        if "value" in record.attrs:
+            return np.broadcast_to(self.data(key), record.attrs['shape'])[tuple(slices)]
+        hslab, post = helper._hyperslab(slices, record.shape)
+        shape = tuple(len(range(*sl.indices(n))) for sl, n in zip(hslab, record.shape))
+        ret = np.empty(shape, dtype=np.float64)
+        if ret.size > 0:
+            record.read_direct(ret, source_sel=hslab)
+        unitSI = record.attrs['unitSI']
+        if unitSI != 1.0:
+            ret *= unitSI
+        return ret[post]
+
     def gridoffset(self, key, axis):
         axid = helper.axesidentify[axis]
         if "gridUnitSI" in self[key].attrs:
@@ -149,12 +246,9 @@ class OpenPMDreader(Dumpreader_ifc):
         """
         attribid = helper.attribidentify[attrib]
         options = {9: lambda s: self.data('particles/' + s + '/weighting'),
-                   0: lambda s: self.data('particles/' + s + '/position/x') +
-                   self.data('particles/' + s + '/positionOffset/x'),
-                   1: lambda s: self.data('particles/' + s + '/position/y') +
-                   self.data('particles/' + s + '/positionOffset/y'),
-                   2: lambda s: self.data('particles/' + s + '/position/z') +
-                   self.data('particles/' + s + '/positionOffset/z'),
+                   0: lambda s: self._position(s, 'x'),
+                   1: lambda s: self._position(s, 'y'),
+                   2: lambda s: self._position(s, 'z'),
                    3: lambda s: self.data('particles/' + s + '/momentum/x'),
                    4: lambda s: self.data('particles/' + s + '/momentum/y'),
                    5: lambda s: self.data('particles/' + s + '/momentum/z'),
@@ -167,19 +261,39 @@ class OpenPMDreader(Dumpreader_ifc):
             raise KeyError
         return ret
 
+    def _position(self, species, axis):
+        '''
+        position + positionOffset of the particles along `axis`.
+        The offset is added in place. Constant records (typically the positionOffset)
+        are never expanded to full arrays.
+        '''
+        ret = self.data('particles/' + species + '/position/' + axis)
+        offset = self.data('particles/' + species + '/positionOffset/' + axis)
+        if np.ndim(ret) > 0:
+            ret += offset
+        else:
+            ret = ret + offset
+        return ret
+
     def getderived(self):
         '''
         return all other fields dumped, except E and B.
         '''
+        import h5py
         ret = []
         self['fields'].visit(ret.append)
         ret = ['fields/' + r for r in ret if not (r.startswith('E') or r.startswith('B'))]
-        ret = [r for r in ret if hasattr(self[r], 'value')]
+        ret = [r for r in ret if isinstance(self[r], h5py.Dataset) or 'value' in self[r].attrs]
         ret.sort()
         return ret
 
+    def __eq__(self, other):
+        ret = super(self.__class__, self).__eq__(other)
+        return ret and self.timestep() == other.timestep()
+
     def __str__(self):
-        return '<OpenPMDh5reader at "' + str(self.dumpidentifier) + '">'
+        return '<OpenPMDh5reader at "' + str(self.dumpidentifier) + '" (iteration ' \
+            + str(self._iteration) + ')>'
 
 
 class FileSeries(Simulationreader_ifc):
@@ -187,24 +301,97 @@ class FileSeries(Simulationreader_ifc):
     Reads a time series of dumps from a given directory.
     The simidentifier is expanded using glob in order to
     find matching files.
+
+    All iterations of all matching files are indexed once, such that series written
+    with file based as well as group based `iterationEncoding` are supported.
+    The dumps are ordered by iteration. Every file is opened only once
+    and its handle is shared by all dumpreaders of the iterations it contains.
+
+    Additional keyword arguments (for example `threads`) are forwarded to the dumpreader.
     '''
 
-    def __init__(self, simidentifier, dumpreadercls=OpenPMDreader, **kwargs):
-        super(self.__class__, self).__init__(simidentifier, **kwargs)
+    # number of file handles kept open by the series.
+    # Handles still in use by a dumpreader will stay open until the dumpreader is deleted.
+    _maxopenfiles = 16
+
+    def __init__(self, simidentifier, dumpreadercls=OpenPMDreader, name=None, **kwargs):
+        super(self.__class__, self).__init__(simidentifier, name=name)
         self.dumpreadercls = dumpreadercls
+        # will be forwarded to the dumpreader
+        self._readerkwargs = kwargs
         import glob
+        import collections
         self._dumpfiles = glob.glob(simidentifier)
         self._dumpfiles.sort()
+        self._h5files = collections.OrderedDict()
+        self._lock = threading.RLock()
+        self._index = None
+
+    def __getstate__(self):
+        # open files and locks cannot be pickled. Needed for `map(..., backend='process')`.
+        state = self.__dict__.copy()
+        del state['_h5files']
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        import collections
+        self.__dict__.update(state)
+        self._h5files = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def _h5file(self, filename):
+        '''
+        returns the open h5py.File for `filename`. The most recently used
+        files are kept open to avoid reopening them for every iteration.
+        '''
+        import h5py
+        with self._lock:
+            try:
+                h5 = self._h5files.pop(filename)
+            except(KeyError):
+                h5 = h5py.File(filename, 'r')
+            self._h5files[filename] = h5
+            while len(self._h5files) > self._maxopenfiles:
+                # just forget about the handle. It will be closed as soon as
+                # no dumpreader is using it anymore.
+                self._h5files.popitem(last=False)
+        return h5
+
+    def _iterationindex(self):
+        '''
+        the list of `(filename, iteration)` of all dumps in this series.
+        '''
+        with self._lock:
+            if self._index is None:
+                index = [(it, f) for f in self._dumpfiles
+                         for it in _iterations(self._h5file(f))]
+                index.sort()
+                self._index = [(f, it) for it, f in index]
+        return self._index
 
     def _getDumpreader(self, n):
         '''
         Do not use this method. It will be called by __getitem__.
         Use __getitem__ instead.
         '''
-        return self.dumpreadercls(self._dumpfiles[n])
+        filename, iteration = self._iterationindex()[n]
+        return self.dumpreadercls(self._h5file(filename), iteration=iteration,
+                                  **self._readerkwargs)
 
     def __len__(self):
-        return len(self._dumpfiles)
+        return len(self._iterationindex())
+
+    def _dumpsource(self, n):
+        return self._iterationindex()[n]
+
+    def _dumpindexfile(self):
+        import os.path
+        # the deepest directory without wildcards
+        path = os.path.dirname(os.path.abspath(self.simidentifier))
+        while re.search(r'[*?[]', path):
+            path = os.path.dirname(path)
+        return os.path.join(path, self._dumpindexfilename)
 
     def __str__(self):
         return '<FileSeries at "' + self.simidentifier + '">'
@@ -83,21 +83,28 @@ class Hdf5reader(Dumpreader_ifc):
     def simdimensions(self):
         return self["compGridGlobal"].attrs["vsNumCells"].shape[0]
 
-    def dataE(self, axis, **kwargs):
-        # x, y, z, px, py, pz same as in sdf. weigt and ID not included.
+    def _readfield(self, key, axis, slices=None):
+        '''
+        reads the component "axis" of the multi-field "key". If "slices" is given,
+        only this part of the grid is read from the file.
+        '''
         axis = helper.axesidentify[axis]
         try:
-            return np.float64(self["ElecMultiField"][..., axis])
+            dataset = self[key]
+            if slices is None:
+                return np.float64(dataset[..., axis])
+            hslab, post = helper._hyperslab(slices, dataset.shape[:-1])
+            return np.float64(dataset[hslab + (axis,)][post])
         except(KeyError):
             return None
 
-    def dataB(self, axis, **kwargs):
+    def dataE(self, axis, slices=None, **kwargs):
+        # x, y, z, px, py, pz same as in sdf. weigt and ID not included.
+        return self._readfield("ElecMultiField", axis, slices=slices)
+
+    def dataB(self, axis, slices=None, **kwargs):
         # x, y, z, px, py, pz same as in sdf. wweigt and ID not included.
-        axis = helper.axesidentify[axis]
-        try:
-            return np.float64(self["MagMultiField"][..., axis])
-        except(KeyError):
-            return None
+        return self._readfield("MagMultiField", axis, slices=slices)
 
     def grid(self, axis):
         ''' returns the array of the positions of all cells on axis = axis.  '''
@@ -179,5 +186,12 @@ class VSimReader(Simulationreader_ifc):
         fileindex = self._steplist.index(self._stepsdumped[index])
         return Hdf5reader(self._filelist[fileindex])
 
+    def _dumpsource(self, index):
+        fileindex = self._steplist.index(self._stepsdumped[index])
+        return self._filelist[fileindex], ''
+
+    def _dumpindexfile(self):
+        return os.path.join(self.path, self._dumpindexfilename)
+
     def __str__(self):
         return '<VSimReader at "' + str(self.path) + '">'
@@ -23,15 +23,40 @@ to a wider range of cases.
 """
 from __future__ import absolute_import, division, print_function, unicode_literals
 
+import copy
 import numpy as np
 
 from . import helper
+from .datahandling import Axis
 
 __all__ = ['kspace_propagate_adaptive']
 
 
+def _pad_into(field, pad, buf):
+    """
+    Pads `field` by `pad` grid points per axis, given as pairs, with zeros like `Field.pad`
+    does, but writes the result into the preallocated array `buf` of the final shape.
+    """
+    ret = copy.copy(field)
+    slices = []
+    for i, (p0, p1) in enumerate(pad):
+        axis = field.axes[i]
+        slices.append(slice(p0, p0 + len(axis)))
+        if p0 or p1:
+            dx = axis.spacing
+            extent = (axis.extent[0] - p0*dx, axis.extent[1] + p1*dx)
+            ret.axes[i] = Axis(axis.name, axis.unit, extent=extent, n=len(axis) + p0 + p1)
+            ret.transformed_axes_origins[i] = None
+    buf[...] = 0
+    buf[tuple(slices)] = field.matrix
+    ret._matrix = buf
+    return ret
+
+
 def _kspace_propagate_adaptive_generator(field_in, axis=0,
-                                         yield_zeroth_step=False):
+                                         yield_zeroth_step=False,
+                                         max_memory=None,
+                                         fft_padsize=helper.fft_padsize_coarse):
     """
     An adaptive method to use Fourier propagation (provided by the function
     `helper.kspace_propagate`) to get far field data.
@@ -44,6 +69,12 @@ def _kspace_propagate_adaptive_generator(field_in, axis=0,
     `axis`: The direction in which to propagate. Currently only propagation parallel to the
     positive x, y or z direction is implemented.
     `yield_zeroth_step`: boolean that determines if the initial step is also output.
+    `max_memory`: upper limit in bytes for the two padded arrays used for each step. If the
+    padding would exceed it, shorter steps with less padding are taken. If this is not
+    sufficient, the resolution of the largest transverse axis is halved. Default is no limit.
+    `fft_padsize`: callable returning the padded size of an axis, see `Field.fft_autopad`.
+    The default `helper.fft_padsize_coarse` only uses few sizes, such that the padded arrays
+    and FFT plans are reused for many steps.
     """
     transform_state = field_in._transform_state()
     if transform_state is None:
@@ -58,17 +89,18 @@ def _kspace_propagate_adaptive_generator(field_in, axis=0,
     else:
         complex_ex = field_in
 
-    moving_window_vect = [0]*complex_ex.dimensions
-    moving_window_vect[axis] = 1
-
     t = 0.0
     x0 = np.mean(complex_ex.axes[axis].extent)
 
     if yield_zeroth_step:
         yield t, field_in
 
+    # The padded field and its kspace. Both are reused as long as the padded shape is the same.
+    bufs = None
+
     while True:
         complex_ex = complex_ex.autoreduce()
+        dtype = np.result_type(complex_ex.matrix, np.complex64)
 
         # print(complex_ex.axes[0].physical_length, complex_ex.axes[1].physical_length)
         lengths = [ax.physical_length for ax in complex_ex.axes]
@@ -76,31 +108,65 @@ def _kspace_propagate_adaptive_generator(field_in, axis=0,
         del transv_lengths[axis]
 
         distance = 0.5*np.mean(transv_lengths)
-        timestep = 1.0*distance / helper.PhysicalConstants.c
-
-        # propagation distance since beginning
-        x = np.mean(complex_ex.axes[axis].extent) - x0 + distance
 
-        # box length in propagation direction
-        xlen = complex_ex.axes[axis].physical_length
+        while True:
+            # propagation distance since beginning
+            x = np.mean(complex_ex.axes[axis].extent) - x0 + distance
+
+            # box length in propagation direction
+            xlen = complex_ex.axes[axis].physical_length
+
+            # padding in prop. dir
+            xpad = distance / x * (0.5*xlen)
+
+            # pad distance in transverse directions and xpad in prop. dir
+            pad = [[distance, distance] for ax in complex_ex.axes]
+            pad[axis] = [xpad, 0.1*xpad]
+
+            # convert to grid points and add the padding to the next fft size
+            for ax, p in zip(complex_ex.axes, pad):
+                p[:] = [int(np.ceil(d / ax.spacing)) for d in p]
+                extra = fft_padsize(len(ax) + sum(p)) - len(ax) - sum(p)
+                p[0] += extra // 2
+                p[1] += extra - extra // 2
+            shape = tuple(len(ax) + sum(p) for ax, p in zip(complex_ex.axes, pad))
+
+            if max_memory is None or 2 * np.prod(shape) * dtype.itemsize <= max_memory:
+                break
+            if distance > np.mean(transv_lengths) / 16:
+                distance *= 0.5
+                continue
+            transv_axes = [i for i in range(complex_ex.dimensions) if i != axis]
+            i = max(transv_axes, key=lambda i: complex_ex.shape[i])
+            if complex_ex.shape[i] < 8:
+                raise MemoryError('The field does not fit into max_memory={} bytes.'
+                                  .format(max_memory))
+            complex_ex = complex_ex.half_resolution(i)
 
-        # padding in prop. dir
-        xpad = distance / x * (0.5*xlen)
+        timestep = 1.0*distance / helper.PhysicalConstants.c
 
-        # pad distance in transverse directions and xpad in prop. dir
-        pad = [distance] * complex_ex.dimensions
-        pad[axis] = [xpad, 0.1*xpad]
+        if bufs is None or bufs[0].shape != shape or bufs[0].dtype != dtype:
+            bufs = [np.empty(shape, dtype=dtype) for _ in range(2)]
+        padbuf, kbuf = bufs
 
         # do padding and fft autopadding
-        complex_ex = complex_ex.pad(pad).fft_autopad()
-
-        # do propagation
-        complex_ex = helper.kspace_propagate(complex_ex, timestep,
-                                             moving_window_vect=moving_window_vect)
+        complex_ex = _pad_into(complex_ex, pad, padbuf)
+
+        # do propagation like `helper.kspace_propagate` with a moving window along `axis`,
+        # removing the antipropagating waves and applying the phase in a single pass.
+        kspace = complex_ex.fft(out=kbuf)
+        kdict = {'k{}'.format(i): k for i, k in enumerate(kspace.meshgrid())}
+        helper._exp_iwt(kdict, timestep,
+                        expr='where(k{} < 0, 0, kspace * exp(-1j * {{omega}} * dt))'.format(axis),
+                        out=kbuf, kspace=kbuf)
+        kspace.transformed_axes_origins[axis] += distance
+        complex_ex = kspace.fft(out=padbuf)
         t += timestep
 
         # remove low field strength outer region
         complex_ex = complex_ex.autocutout(fractions=(0.01, 0.02))
+        if np.may_share_memory(complex_ex.matrix, padbuf):
+            complex_ex = complex_ex.copy()
 
         if do_fft:
             yield t, complex_ex.fft()
@@ -22,6 +22,9 @@ Some global constants that are used in the code.
 from __future__ import absolute_import, division, print_function, unicode_literals
 
 import sys
+import os
+import threading
+import contextlib
 import copy
 import itertools
 import collections
@@ -45,8 +48,20 @@ else:
     have_concurrent_futures = False
 
 
+try:
+    import psutil
+    nproc = psutil.cpu_count(logical=False)
+except ImportError:
+    try:
+        nproc = os.cpu_count()
+    except AttributeError:
+        import multiprocessing
+        nproc = multiprocessing.cpu_count()
+
+
 __all__ = ['PhysicalConstants', 'unstagger_fields', 'kspace_epoch_like', 'kspace',
-           'kspace_propagate', 'time_profile_at_plane']
+           'kspace_propagate', 'time_profile_at_plane', 'clear_kspace_cache',
+           'set_kspace_cachesize']
 
 
 def isnotebook():
@@ -293,23 +308,78 @@ def map_coordinates_parallel(input, coordinates, output=None, order=3, mode='con
     if len(list_of_chunk_args) == 1:
         threads = 1
 
-    if threads != 1:
-        threadpool = ThreadPoolExecutor(threads)
-        my_map = threadpool.map
-    else:
-        my_map = map
+    # execution happens here
+    _threadmap(map_coordinates_chunk, list_of_chunk_args, threads)
+
+    return retval
 
+
+def _atomicwrite(filename, write, mode='w'):
+    '''
+    creates the file `filename` by calling `write(f)` on a temporary file, which then
+    replaces `filename` atomically. Thus other sessions reading the file at the same time
+    never see it half written. Missing directories are created. Returns False, if the file
+    could not be written, for example in a read only location.
+    '''
+    tmpfile = '{}.{:d}.tmp'.format(filename, os.getpid())
+    replace = getattr(os, 'replace', os.rename)
+    try:
+        dirname = os.path.dirname(filename)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+        with open(tmpfile, mode) as f:
+            write(f)
+        replace(tmpfile, filename)
+    except (IOError, OSError):
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+        return False
+    return True
+
+
+def _threadmap(func, iterable, threads):
+    '''
+    like `list(map(func, iterable))`, but evaluated by a pool of `threads` threads.
+    '''
+    if threads == 1:
+        return list(map(func, iterable))
+    threadpool = ThreadPoolExecutor(threads)
     # execution happens here
-    list(my_map(map_coordinates_chunk, list_of_chunk_args))
+    ret = list(threadpool.map(func, iterable))
+    if have_concurrent_futures:
+        threadpool.shutdown()
+    else:
+        threadpool.close()
+        threadpool.join()
+    return ret
 
-    if threads != 1:
-        if have_concurrent_futures:
-            threadpool.shutdown()
-        else:
-            threadpool.close()
-            threadpool.join()
 
-    return retval
+def _hyperslab(slices, shape):
+    '''
+    splits numpy-like `slices` on an array of `shape` into a hdf5 hyperslab, which only
+    contains slices with positive steps, and the index, which must be applied to the
+    data read from this hyperslab to get the result of the original `slices`.
+    '''
+    slices = tuple(slices) + (slice(None),) * (len(shape) - len(slices))
+    hslab = []
+    post = []
+    for sl, n in zip(slices, shape):
+        if isinstance(sl, slice):
+            idx = range(*sl.indices(n))
+            if len(idx) == 0:
+                hslab.append(slice(0, 0))
+                post.append(slice(None))
+            elif idx.step < 0:
+                hslab.append(slice(idx[-1], idx[0] + 1, -idx.step))
+                post.append(slice(None, None, -1))
+            else:
+                hslab.append(slice(idx[0], idx[-1] + 1, idx.step))
+                post.append(slice(None))
+        else:
+            i = range(n)[sl]
+            hslab.append(slice(i, i + 1))
+            post.append(0)
+    return tuple(hslab), tuple(post)
 
 
 def jac_det(jacobian_func):
@@ -340,6 +410,15 @@ def islinear(grid):
     return np.all(np.isclose(grid, np.linspace(grid[0], grid[-1], len(grid))))
 
 
+def _hasconstantspacing(grid, rtol=1e-9):
+    '''
+    checks if `grid` is linear, comparing its spacings relative to their mean. Unlike
+    `islinear`, this does not depend on the scale of the grid.
+    '''
+    d = np.diff(grid)
+    return np.allclose(d, d.mean(), rtol=rtol, atol=0)
+
+
 def monotonicity(arr, axis=-1):
     """
     Checks if an array is strictly monotonically increasing or decreasing.
@@ -494,6 +573,19 @@ def fft_padsize_power2(n):
     return 1 << n.bit_length()
 
 
+def fft_padsize_coarse(n):
+    '''
+    returns the next size equal or larger than `n` of the form 2**a or 3*2**a.
+    These sizes are fast with all FFT libraries. As there are only few of them, the FFT
+    plans of a growing field are reused for many transforms.
+    '''
+    p = 1 << (int(n) - 1).bit_length()
+    return 3 * p // 4 if p >= 4 and 3 * p // 4 >= n else p
+
+
+_omega_yee_funcs = collections.OrderedDict()
+
+
 def omega_yee_factory(dx, dt):
     """
     Return a function omega_yee that is suitable as input for kspace.
@@ -504,11 +596,22 @@ def omega_yee_factory(dx, dt):
 
     dt: time step, e. g.
     dt = dumpreader.time()/dumpreader.timestep()
+
+    The same function object is returned for the same arguments, such that the values
+    cached by `kspace` for this dispersion relation can be reused.
     """
+    key = (tuple(dx), dt)
+    if key in _omega_yee_funcs:
+        return _omega_yee_funcs[key]
+
     def omega_yee(kmesh):
         tmp = sum((np.sin(0.5 * kxi * dxi) / dxi)**2 for kxi, dxi in zip(kmesh, dx))
         omega = 2.0*np.arcsin(PhysicalConstants.c * dt * np.sqrt(tmp))/dt
         return omega
+
+    _omega_yee_funcs[key] = omega_yee
+    while len(_omega_yee_funcs) > 16:
+        _omega_yee_funcs.popitem(last=False)
     return omega_yee
 
 
@@ -650,9 +753,9 @@ def _linear_interpolation_frequency_response_on_k(lin_response_omega, k_axes, om
     """
     from . import datahandling
 
-    kmesh = meshgrid(*[ax.grid for ax in k_axes], indexing='ij', sparse=True)
+    kmesh, omega = _kspace_omega(k_axes, omega_func)
 
-    resp_mat = abs(lin_response_omega(omega_func(kmesh)))
+    resp_mat = abs(lin_response_omega(omega))
 
     lin_res_k = datahandling.Field(resp_mat, name='f', axes=k_axes)
 
@@ -717,6 +820,114 @@ def kspace_epoch_like(component, fields, dt, extent=None, omega_func=omega_free,
     return kspace(component, fields, interpolation='fourier')
 
 
+# The k mesh, the dispersion relation and the prefactors of the cross product in `kspace`
+# for the last few grids. Reconstructing several components on the same grid reuses them.
+# Each entry holds arrays of the size of the grid, so by default entries are only kept
+# within a `_kspace_cachescope`, e.g. during `kspace_all`. A size of 0 disables the cache.
+_kspace_cachesize = 0
+_kspace_scopesize = 6
+_kspace_scopes = 0
+_kspace_cache = collections.OrderedDict()
+_kspace_cache_lock = threading.Lock()
+
+
+def _kspace_trimcache():
+    '''
+    drops the oldest entries exceeding the current size limit. Hold `_kspace_cache_lock`.
+    '''
+    size = max(_kspace_cachesize, _kspace_scopesize if _kspace_scopes > 0 else 0)
+    while len(_kspace_cache) > size:
+        _kspace_cache.popitem(last=False)
+
+
+@contextlib.contextmanager
+def _kspace_cachescope():
+    '''
+    keeps the last few entries of the kspace cache while the context is active,
+    even if the cache is disabled. They are freed on exit.
+    '''
+    global _kspace_scopes
+    with _kspace_cache_lock:
+        _kspace_scopes += 1
+    try:
+        yield
+    finally:
+        with _kspace_cache_lock:
+            _kspace_scopes -= 1
+            _kspace_trimcache()
+
+
+def _kspace_cached(key, func):
+    '''
+    returns `func()`, which is cached in `_kspace_cache` under `key`.
+    '''
+    with _kspace_cache_lock:
+        if key in _kspace_cache:
+            ret = _kspace_cache.pop(key)
+            _kspace_cache[key] = ret
+            return ret
+    ret = func()
+    with _kspace_cache_lock:
+        _kspace_cache[key] = ret
+        _kspace_trimcache()
+    return ret
+
+
+def clear_kspace_cache():
+    '''
+    frees the k meshes, dispersion relations and prefactors cached by `kspace`.
+    '''
+    with _kspace_cache_lock:
+        _kspace_cache.clear()
+
+
+def set_kspace_cachesize(size):
+    '''
+    sets the number of entries `kspace` keeps cached between calls (default: 0) and
+    returns the previous value. Each entry holds arrays of the size of a grid.
+    `kspace_all` of the dumpreaders always reuses the entries during the call.
+    '''
+    global _kspace_cachesize
+    with _kspace_cache_lock:
+        previous, _kspace_cachesize = _kspace_cachesize, int(size)
+        _kspace_trimcache()
+    return previous
+
+
+def _kspace_omega(axes, omega_func):
+    '''
+    returns the sparse k mesh of `axes` and `omega_func` evaluated on it.
+    '''
+    def calc():
+        mesh = meshgrid(*[ax.grid for ax in axes], indexing='ij', sparse=True)
+        omega = np.asarray(omega_func(mesh))
+        omega.flags.writeable = False
+        return mesh, omega
+    key = ('omega', tuple(ax._fingerprint() for ax in axes), omega_func)
+    return _kspace_cached(key, calc)
+
+
+def _kspace_prefactor(axes, omega_func, polfield):
+    '''
+    returns the sparse k mesh of `axes` and the prefactor in front of the cross product
+    in `kspace` for the reconstruction of `polfield` ('E' or 'B').
+    '''
+    def calc():
+        mesh, omega = _kspace_omega(axes, omega_func)
+        k2 = sum(ki**2 for ki in mesh)
+        # this will produce nan/inf in specific places, which are replaced by 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if polfield == "E":
+                prefactor = omega/k2
+            else:
+                prefactor = -1.0/omega
+        prefactor[~np.isfinite(prefactor)] = 0.0
+        prefactor.flags.writeable = False
+        return mesh, prefactor
+    key = ('prefactor', tuple(ax._fingerprint() for ax in axes), omega_func, polfield)
+    return _kspace_cached(key, calc)
+
+
 def kspace(component, fields, extent=None, interpolation=None, omega_func=omega_free):
     '''
     Reconstruct the physical kspace of one polarization component
@@ -757,6 +968,9 @@ def kspace(component, fields, extent=None, interpolation=None, omega_func=omega_
     The keyword-argument omega_func may be used to pass a function that will
     calculate the dispersion relation of the simulation may be given. The
     function will receive one argument that contains the k mesh.
+
+    The k mesh, the dispersion relation and the prefactors can be cached for the last few
+    grids, see `set_kspace_cachesize` and `clear_kspace_cache`.
     '''
     # target field is polfield and the other field is otherfield
     polfield = component[0]
@@ -780,8 +994,9 @@ def kspace(component, fields, extent=None, interpolation=None, omega_func=omega_
     except KeyError:
         raise ValueError("Required field {} not present in fields".format(component))
 
-    # Change to frequency domain
-    result = result.ensure_frequency_domain()
+    # Change to frequency domain. The shallow copy keeps the given Field unchanged, if it
+    # is already in frequency domain, as the matrix of result will be replaced below.
+    result = copy.copy(result.ensure_frequency_domain())
 
     result_spatial_grid = result._conjugate_grid()
     result_spatial_grid = [result_spatial_grid[k] for k in sorted(result_spatial_grid.keys())]
@@ -797,37 +1012,25 @@ def kspace(component, fields, extent=None, interpolation=None, omega_func=omega_
 
     # print('result_origin', result_origin, Dx, dx)
 
-    # calculate the k mesh and k^2
-    mesh = meshgrid(*[ax.grid for ax in result.axes], indexing='ij', sparse=True)
-    k2 = sum(ki**2 for ki in mesh)
-
-    # calculate omega, either using the vacuum expression or omega_func()
-    omega = omega_func(mesh)
-
-    # calculate the prefactor in front of the cross product
-    # this will produce nan/inf in specific places, which are replaced by 0
-    with np.errstate(invalid='ignore', divide='ignore'):
-        if polfield == "E":
-            prefactor = omega/k2
-        else:
-            prefactor = -1.0/omega
-
-    prefactor[np.isnan(prefactor)] = 0.0
-    prefactor[np.isinf(prefactor)] = 0.0
+    # the k mesh and the prefactor in front of the cross product, calculated with
+    # either the vacuum expression or omega_func(). Both are cached for the current grid.
+    mesh, prefactor = _kspace_prefactor(result.axes, omega_func, polfield)
 
     # add/subtract the two terms of the cross-product
+    buf = None
     # i chooses the otherfield component  (polaxis+i) % 3
     # mesh_i chooses the k-axis component (polaxis-i) % 3
     # which recreates the crossproduct
     for i in (1, 2):
         mesh_i = (polaxis-i) % 3
         if mesh_i < len(mesh):
-            # copy the otherfield component, transform and reverse the grid stagger
+            # get the otherfield component, transform and reverse the grid stagger.
+            # The given Fields are only read, transformations return new Fields.
             field_key = field_keys[otherfield][(polaxis+i) % 3]
             try:
-                field = copy.deepcopy(fields[field_key])
-            except KeyError as e:
-                raise ValueError("Required field {} not present in fields".format(e.message))
+                field = fields[field_key]
+            except KeyError:
+                raise ValueError("Required field {} not present in fields".format(field_key))
 
             field_transform_state = field._transform_state()
             if field_transform_state is None:
@@ -896,16 +1099,21 @@ def kspace(component, fields, extent=None, interpolation=None, omega_func=omega_
 
             field = field.ensure_frequency_domain()
 
-            # fourier interpolation is done implicitly by the fft code
-            if interpolation == 'fourier':
-                field = field._shift_grid_by_fourier(dict(enumerate(grid_shift)), skip_fft=True)
+            # fourier interpolation is done implicitly by the fft code, which removes the
+            # phases of the grid origins. Only the origins of the field would be changed by
+            # `field._shift_grid_by_fourier(dict(enumerate(grid_shift)), skip_fft=True)`,
+            # which do not enter the result.
 
             # add the field to the result with the appropriate prefactor
             # result.matrix += (-1)**(i-1) * prefactor * mesh[mesh_i] * field.matrix
+            # The first term allocates the buffer of the result, later ones are added in place.
             mesh_mesh_i = mesh[mesh_i]
-            rm = result.matrix
+            rm = result.matrix if buf is None else buf
             fm = field.matrix
-            result.matrix = ne.evaluate('rm + (-1)**(i-1) * prefactor * mesh_mesh_i * fm')
+            buf = ne.evaluate('rm + (-1)**(i-1) * prefactor * mesh_mesh_i * fm', out=buf)
+
+    if buf is not None:
+        result.matrix = buf
 
     return result
 
@@ -936,6 +1144,27 @@ def _linear_phase(field, dx, phi0=0.0):
     return exp_ikdx_expr, kdict
 
 
+def _linear_phase_factors(field, dx, phi0=0.0):
+    '''
+    The linear phase of `_linear_phase` separated into a constant and one 1D factor per axis,
+    which is shaped to broadcast against `field`. Axes with a vanishing `dx` are omitted.
+
+    Returns the constant and a dict of the factors, named `p0`, `p1`, ... by axis.
+    '''
+    transform_state = field._transform_state(dx.keys())
+    sign = 1 if transform_state is True else -1
+
+    factors = dict()
+    for i, d in dx.items():
+        if d == 0:
+            continue
+        shape = [1] * field.dimensions
+        shape[i] = field.shape[i]
+        factors['p{}'.format(i)] = np.exp(sign * 1j * d * field.axes[i].grid).reshape(shape)
+
+    return np.exp(sign * 1j * phi0), factors
+
+
 def linear_phase(field, dx, phi0=0.0):
     '''
     Calculates the linear phase as used in Field._apply_linear_phase and
@@ -945,11 +1174,31 @@ def linear_phase(field, dx, phi0=0.0):
     return ne.evaluate(exp_ikdx_expr, local_dict=kdict, global_dict=None)
 
 
+def _exp_iwt(kdict, dt, expr='exp(-1j * {omega} * dt)', out=None, **variables):
+    '''
+    evaluates `expr` with the free space dispersion relation `{omega}` on the k mesh given
+    in `kdict` as `k0`, `k1`, ... Further `variables` of `expr` may be given as keywords.
+    The result is written to `out`, if given.
+    '''
+    # optimized version of
+    # omega = PhysicalConstants.c * np.sqrt(sum(k**2 for k in kspace.meshgrid()))
+    # using numexpr:
+    k2_expr = '+'.join('{}**2'.format(i) for i in kdict.keys())
+
+    numexpr_vars = dict(variables, c=PhysicalConstants.c, dt=dt)
+    numexpr_vars.update(kdict)
+    omega_expr = 'c*sqrt({})'.format(k2_expr)
+    return ne.evaluate(expr.format(omega=omega_expr),
+                       local_dict=numexpr_vars,
+                       global_dict=None, out=out)
+
+
 def _kspace_propagate_generator(kspace, dt, moving_window_vect=None,
                                 move_window=None,
                                 remove_antipropagating_waves=None,
                                 yield_zeroth_step=False,
-                                use_numexpr_in_inner_loop=True):
+                                use_numexpr_in_inner_loop=True,
+                                yield_views=False):
     '''
     Evolve time on a field.
     This function checks the transform_state of the field and transforms first from spatial
@@ -982,6 +1231,11 @@ def _kspace_propagate_generator(kspace, dt, moving_window_vect=None,
     remove_antipropagating_waves=False.
     If remove_antipropagating_waves is None, the deletion of the antipropagating modes
     is automatically enabled if moving_window_vect is given.
+
+    The time steps are calculated in place. If yield_views is True, the yielded fields share
+    their memory with two buffers, which are used alternately. Such a field is only valid
+    until the step after the next one is calculated, but no full size arrays are allocated
+    during the propagation. Use `field.copy()` to keep a result.
     '''
     transform_state = kspace._transform_state()
     if transform_state is None:
@@ -995,20 +1249,8 @@ def _kspace_propagate_generator(kspace, dt, moving_window_vect=None,
         kspace = kspace.fft()
 
     # calculate free space dispersion relation
-
-    # optimized version of
-    # omega = PhysicalConstants.c * np.sqrt(sum(k**2 for k in kspace.meshgrid()))
-    # using numexpr:
     kdict = {'k{}'.format(i): k for i, k in enumerate(kspace.meshgrid())}
-    k2_expr = '+'.join('{}**2'.format(i) for i in kdict.keys())
-
-    numexpr_vars = dict(c=PhysicalConstants.c, dt=dt)
-    numexpr_vars.update(kdict)
-    omega_expr = 'c*sqrt({})'.format(k2_expr)
-    exp_iwt_expr = 'exp(-1j * {omega} * dt)'.format(omega=omega_expr)
-    exp_iwt = ne.evaluate(exp_iwt_expr,
-                          local_dict=numexpr_vars,
-                          global_dict=None)
+    exp_iwt = _exp_iwt(kdict, dt)
 
     # calculate propagation distance for the moving window
     dz = PhysicalConstants.c * dt
@@ -1056,19 +1298,31 @@ def _kspace_propagate_generator(kspace, dt, moving_window_vect=None,
         if moving_window_vect is None:
             raise ValueError("Missing required argument moving_window_vect.")
 
-    while True:
+    # buffers for the in place time steps. The kspace needs a new array for every step
+    # only if it is yielded as a fresh field. Yielded views alternate between two buffers.
+    dtype = np.result_type(kspace.matrix, exp_iwt)
+    nbufs = 1 if do_fft else 2 if yield_views else 0
+    kbufs = [np.empty(kspace.shape, dtype=dtype) for _ in range(nbufs)]
+    fftbufs = [np.empty(kspace.shape, dtype=dtype) for _ in range(2)] \
+        if do_fft and yield_views else [None, None]
+
+    for step in itertools.count():
+        kout = kbufs[step % nbufs] if nbufs else None
         # Apply the phase due the propagation via the dispersion relation omega
         if use_numexpr_in_inner_loop:
-            kspace = kspace.replace_data(ne.evaluate('kspace * exp_iwt'))
+            m = ne.evaluate('kspace * exp_iwt',
+                            local_dict=dict(kspace=kspace.matrix, exp_iwt=exp_iwt),
+                            global_dict=None, out=kout)
         else:
-            kspace = kspace * exp_iwt
+            m = np.multiply(kspace.matrix, exp_iwt, out=kout)
+        kspace = kspace.replace_data(m)
 
         if move_window:
             for i in moving_window_dict.keys():
                 kspace.transformed_axes_origins[i] += moving_window_dict[i]
 
         if do_fft:
-            yield kspace.fft()
+            yield kspace.fft(out=fftbufs[step % 2])
         else:
             yield kspace
 
@@ -1091,7 +1345,7 @@ def kspace_propagate(kspace, dt, nsteps=1, **kwargs):
 
 
 def time_profile_at_plane(kspace_or_complex_field, axis='x', value=None, dir=1, t_input=0.0,
-                          **kwargs):
+                          threads=1, **kwargs):
     '''
     'Measure' the time-profile of the propagating `complex_field` while passing through a plane.
 
@@ -1117,6 +1371,10 @@ def time_profile_at_plane(kspace_or_complex_field, axis='x', value=None, dir=1,
     t_input specifies the point in time at which the input field or kspace is given. This is used
     to specify the time axis of the output fields.
 
+    `threads` time steps are calculated in parallel. Each thread needs a buffer of the size of
+    the kspace. The steps use numpy operations, which release the GIL, so the threads
+    actually run concurrently.
+
     For example `axis='x'` and `value=0.0` specifies the 'x=0.0' plane while `dir=1` specifies
     propagation towards positive 'x' values. The 'x' axis starts at 2e-5 and ends at 6e-5 with
     a grid spacing of 1e-6. The default value for the measurement plane would have been 6.1e-5
@@ -1193,23 +1451,41 @@ def time_profile_at_plane(kspace_or_complex_field, axis='x', value=None, dir=1,
     phi0 = input_origin * output_origin
     kspace = kspace._apply_linear_phase({axis: output_origin}, phi0=-phi0)
 
-    # setup a generator for the propagated kspaces
-    kwargs['nsteps'] = len(complex_field.axes[axis])
+    # remove the antipropagating waves, as done by kspace_propagate before the first step
+    kwargs['nsteps'] = 1
     kwargs['move_window'] = False
     kwargs['yield_zeroth_step'] = True
-    gen = kspace_propagate(kspace, dt, **kwargs)
+    kspace = kspace_propagate(kspace, 0.0, **kwargs)
+
+    # Step n of the propagation is kspace * exp_iwt**n, of which only the sum along `axis`,
+    # the 0-component of the inverse transform, is needed. The steps are split into batches,
+    # which start from the phase of their first step and can be calculated in parallel.
+    kdict = {'k{}'.format(i): k for i, k in enumerate(kspace.meshgrid())}
+    exp_iwt = _exp_iwt(kdict, dt)
+    km = kspace.matrix
+    nsteps = len(complex_field.axes[axis])
+    threads = max(min(threads, nsteps), 1)
+    bounds = np.linspace(0, nsteps, threads + 1).astype(int)
 
     # initialize an empty matrix
     newmat = np.empty_like(kspace.matrix)
-    slices = [slice(None)] * kspace.dimensions
-    expr = 'sum(km, {})'.format(axis)
-    for i, kspace_prop in enumerate(gen):
-        # fill the new matrix line by line by calculating the 0-component of the inverse
-        # transform after each propagation step
-        slices[axis] = i
-        km = kspace_prop.matrix
-        # newmat[slices] = np.sum(kspace_prop.matrix, axis=axis)
-        newmat[tuple(slices)] = ne.evaluate(expr)
+
+    def batch(steps):
+        start, stop = steps
+        if start == stop:
+            return
+        buf = _exp_iwt(kdict, dt, expr='km * exp(-1j * {omega} * dt * n)', km=km, n=start)
+        slices = [slice(None)] * kspace.dimensions
+        for i in range(start, stop):
+            # fill the new matrix line by line by calculating the 0-component of the inverse
+            # transform after each propagation step
+            slices[axis] = i
+            # plain numpy ufuncs release the GIL, while numexpr serializes the threads
+            np.sum(buf, axis=axis, out=newmat[tuple(slices)])
+            if i + 1 < stop:
+                np.multiply(buf, exp_iwt, out=buf)
+
+    _threadmap(batch, zip(bounds[:-1], bounds[1:]), threads)
 
     k_transverse_tprofile = kspace.replace_data(newmat)
     t_axis = datahandling.Axis(name='t', unit='s',
@@ -135,14 +135,14 @@ class _SingleSpecies(object):
             ret = self._dumpreader.time()
         elif key in ['mass', 'charge']:
             try:
-                ret = self._dumpreader.getSpecies(self.species, key)
+                ret = self._dumpreader._readspecies(self.species, key)
             except(KeyError):
                 # in the special case of mass or charge try to deduce mass or charge
                 # from the species name.
                 self._idfy = identifyspecies(self.species)
                 ret = self._idfy[key]
         else:
-            ret = self._dumpreader.getSpecies(self.species, key)
+            ret = self._dumpreader._readspecies(self.species, key)
         # now that we have got the data, check if compress was used and/or maybe cache value
         ret = np.int64(ret) if key == 'id' else np.float64(ret)
         if ret.shape is ():  # cache single scalars always
@@ -1272,7 +1272,11 @@ class ParticleHistory(object):
         Indexorder of returned array: [particle_idx][scalarf_idx, collection_idx]
         '''
         particlelist = [list() for _ in range(len(self.ids))]
-        for dr in self.sr:
+        drs = self.sr
+        if hasattr(drs, 'prefetch'):
+            # open the next dump while the current one is evaluated
+            drs = drs.prefetch(depth=1, keys=[(s, 'id') for s in self.speciess])
+        for dr in drs:
             ids, scalars = self._collectfromdump(dr, scalarfs)
             for k in range(len(ids)):
                 i = self._id2i[ids[k]]
@@ -10,6 +10,14 @@ import copy
 import scipy.integrate
 import pkg_resources as pr
 import sys
+import os
+import shutil
+import tempfile
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
 
 class TestAxis(unittest.TestCase):
 
@@ -40,6 +48,52 @@ class TestAxis(unittest.TestCase):
         self.assertTrue(self.ax.islinear())
         self.assertTrue(self.ax.islinear(force=True))
 
+    def test_equality(self):
+        self.assertTrue(self.ax == self.ax)
+        ax = dh.Axis(name='other', grid_node=self.ax.grid_node.copy())
+        self.assertTrue(self.ax == ax)
+        self.assertFalse(self.ax != ax)
+        self.assertRaises(TypeError, hash, ax)
+        self.assertFalse(self.ax == dh.Axis(grid_node=self.ax.grid_node[:-1]))
+        self.assertFalse(self.ax == dh.Axis(grid_node=2 * self.ax.grid_node))
+        ax = dh.Axis(grid_node=self.ax.grid_node * (1 + 1e-12))
+        self.assertTrue(self.ax == ax)
+
+    def test_linear_lazy(self):
+        ax = dh.Axis(extent=(-1,1), n=1000)
+        self.assertTrue(ax.islinear())
+        self.assertEqual(ax.spacing, 0.002)
+        self.assertIsNone(ax._grid_node)
+        self.assertIsNone(ax._grid)
+        self.assertAllClose(ax.grid_node, np.linspace(-1, 1, 1001))
+        self.assertAllClose(ax.grid, np.linspace(-0.999, 0.999, 1000))
+        self.assertFalse(ax.grid.flags.writeable)
+        self.assertEqual(ax, dh.Axis(grid=ax.grid))
+        self.assertEqual(ax, dh.Axis(grid_node=ax.grid_node))
+
+    def test_nonlinear_small_scale(self):
+        grid = np.array([0, 1, 3, 7, 15, 31.]) * 1e-15
+        ax = dh.Axis('t', 's', grid=grid)
+        self.assertAllClose(ax.grid, grid)
+        self.assertTrue(np.all(np.diff(ax.grid_node) > 0))
+        ax = dh.Axis('t', 's', grid_node=grid)
+        self.assertAllClose(ax.grid_node, grid)
+        self.assertTrue(np.all(ax.grid > ax.grid_node[:-1]))
+
+    def test_trusted_children(self):
+        ax = dh.Axis(extent=(-1,1), n=101)
+        axm = dh.Axis(grid_node=ax.grid_node.copy())
+        for sub, subm in [(ax[10:40], axm[10:40]), (ax[-0.5:0.5], axm[-0.5:0.5]),
+                          (ax.half_resolution(), axm.half_resolution()),
+                          (ax.reversed(), axm.reversed())]:
+            self.assertEqual(len(sub), len(subm))
+            self.assertAllClose(sub.extent, subm.extent)
+            self.assertAllClose(sub.grid_node, subm.grid_node)
+            self.assertAllClose(sub.grid, subm.grid)
+        self.assertIsNone(dh.Axis(extent=(-1,1), n=101)[10:40]._grid_node)
+        self.assertTrue(axm[10:40].islinear())
+        self.assertFalse(axm[10:40].grid.flags.writeable)
+
     def test_initiate(self):
         ax = dh.Axis(extent=(-1,1), n=101)
         self.assertEqual(ax.name, '')
@@ -355,6 +409,35 @@ class TestField(unittest.TestCase):
         # this is passed only with the new implementation
         self.assertAllClose(spectrum_reference, yf, atol=1e-10)
 
+    def test_fft_real(self):
+        # real data uses a half spectrum transform, complex data the full one
+        for n in (16, 17):
+            f = dh.Field(np.random.random((n, 10)),
+                         axes=[dh.Axis(extent=(1.3, 4.5), n=n), dh.Axis(extent=(-2, 3), n=10)])
+            for kwargs in [{}, dict(axes=1), dict(exponential_signs='temporal'),
+                           dict(old_behaviour=True)]:
+                fr = f.fft(**kwargs)
+                fc = (f + 0j).fft(**kwargs)
+                self.assertAllClose(fr.matrix, fc.matrix, atol=1e-12)
+                self.assertAllClose(fr.grid[1], fc.grid[1])
+                self.assertEqual(fr.transformed_axes_origins, fc.transformed_axes_origins)
+            k = f.fft().real
+            self.assertAllClose(k.fft().matrix, (k + 0j).fft().matrix, atol=1e-12)
+
+    def test_fft_out(self):
+        f = dh.Field(np.random.random((16, 10)),
+                     axes=[dh.Axis(extent=(1.3, 4.5), n=16), dh.Axis(extent=(-2, 3), n=10)])
+        for field in (f, f + 0j, f.fft()):
+            out = np.empty(f.shape, dtype=complex)
+            ref = field.fft()
+            ret = field.fft(out=out)
+            self.assertTrue(ret.matrix is out)
+            self.assertAllClose(ret.matrix, ref.matrix, atol=1e-12)
+            self.assertEqual(ret.transformed_axes_origins, ref.transformed_axes_origins)
+        g = f + 0j
+        ref = g.fft()
+        self.assertAllClose(g.fft(out=g.matrix).matrix, ref.matrix, atol=1e-12)
+
     def test_conjugate_grid(self):
         f1d_grid = self.f1d.grid
         f1d_grid2 = self.f1d.ensure_frequency_domain()._conjugate_grid()
@@ -670,6 +753,30 @@ class TestField(unittest.TestCase):
         self.assertTrue(isinstance(a, dh.Field))
         self.assertAllEqual(a.matrix, np.ones_like(a.matrix))
 
+    def test_ufunc_out(self):
+        a = self.f2d.copy()
+        m = a.matrix
+        b = np.multiply(a, 2, out=a)
+        self.assertTrue(b is a)
+        self.assertTrue(a.matrix is m)
+        self.assertAllEqual(a.matrix, 2 * self.f2d.matrix)
+        c = self.f2d.copy()
+        b = np.add(a, self.f2d, out=c)
+        self.assertTrue(b is c)
+        self.assertAllEqual(c.matrix, 3 * self.f2d.matrix)
+        b = a.evaluate('a - 1', out=c)
+        self.assertTrue(b is c)
+        self.assertAllEqual(c.matrix, 2 * self.f2d.matrix - 1)
+
+    def test_ufunc_metadata(self):
+        a = self.f2d + self.f2d
+        self.assertTrue(a.axes[0] is self.f2d.axes[0])
+        # results must not share mutable metadata with their inputs
+        for b in [self.f2d * 2, a + self.f2d, np.sin(self.f2d)]:
+            self.assertTrue(b.axes_transform_state is not self.f2d.axes_transform_state)
+            self.assertTrue(b.transformed_axes_origins is not
+                            self.f2d.transformed_axes_origins)
+
 
     def test_operators_broadcasting(self):
         a = self.f2d
@@ -768,5 +875,133 @@ class TestField(unittest.TestCase):
         # self.assertAllEqual(f2drot.extent, f2dr.extent)
 
 
+class TestFieldOutOfCore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.blocksize = dh._outofcore_blocksize
+        # force many small blocks
+        dh._outofcore_blocksize = 40
+        m = np.random.RandomState(0).rand(13, 7, 5)
+        axes = [dh.Axis(grid=np.arange(13)**2), dh.Axis(extent=(0, 1), n=7),
+                dh.Axis(extent=(-1, 1), n=5)]
+        self.f = dh.Field(m, axes=axes)
+        mm = np.memmap(os.path.join(self.tmpdir, 'data.bin'), dtype='d', mode='w+',
+                       shape=m.shape)
+        mm[:] = m
+        self.fields = [dh.Field.from_dataset(mm, axes=axes)]
+        if h5py is not None:
+            self.h5 = h5py.File(os.path.join(self.tmpdir, 'data.h5'), 'w')
+            dset = self.h5.create_dataset('data', data=m, chunks=(2, 7, 5))
+            self.fields.append(dh.Field.from_dataset(dset, axes=axes))
+
+    def tearDown(self):
+        dh._outofcore_blocksize = self.blocksize
+        if h5py is not None:
+            self.h5.close()
+        del self.fields
+        shutil.rmtree(self.tmpdir)
+
+    def test_reductions(self):
+        for f in self.fields:
+            self.assertTrue(f._outofcore)
+            self.assertEqual(f.shape, (13, 7, 5))
+            for method in ['sum', 'mean', 'max', 'min', 'prod', 'std', 'ptp']:
+                for axis in [None, 0, 1, (0, 2), -1]:
+                    ret = getattr(f, method)(axis=axis)
+                    expected = getattr(self.f, method)(axis=axis)
+                    npt.assert_allclose(ret.matrix, expected.matrix)
+                    self.assertEqual(ret.axes, expected.axes)
+            ret = f.mean(axis=(0, 1, 2), keepdims=True)
+            npt.assert_allclose(ret.matrix, self.f.mean(axis=(0, 1, 2), keepdims=True).matrix)
+
+    def test_integrate(self):
+        for f in self.fields:
+            for axes in [None, 0, (1, 2), (0, 2)]:
+                ret = f.integrate(axes=axes, method='fast')
+                expected = self.f.integrate(axes=axes, method='fast')
+                npt.assert_allclose(ret.matrix, expected.matrix)
+                self.assertEqual(type(ret.matrix), type(expected.matrix))
+                self.assertEqual(ret.axes, expected.axes)
+
+    def test_half_resolution(self):
+        for f in self.fields:
+            for axis in range(3):
+                ret = f.half_resolution(axis)
+                expected = self.f.half_resolution(axis)
+                npt.assert_allclose(ret.matrix, expected.matrix)
+                self.assertEqual(ret.axes, expected.axes)
+
+    def test_getitem(self):
+        for f in self.fields:
+            ret = f[3:9, ::-1, 2]
+            npt.assert_allclose(ret.matrix, self.f[3:9, ::-1, 2].matrix)
+            ret = f.cutout((4, 40, 0, 0.5, -1, 1))
+            npt.assert_allclose(ret.matrix, self.f.cutout((4, 40, 0, 0.5, -1, 1)).matrix)
+            c = f.copy()
+            self.assertFalse(c._outofcore)
+            npt.assert_equal(c.matrix, self.f.matrix)
+
+    def test_squeeze(self):
+        m = np.random.RandomState(1).rand(1, 20) + 1j
+        data = [np.memmap(os.path.join(self.tmpdir, 'c.bin'), dtype=complex, mode='w+',
+                          shape=m.shape)]
+        if h5py is not None:
+            data.append(self.h5.create_dataset('c', data=m))
+        data[0][:] = m
+        for d in data:
+            # the constructor reads the data and squeezes it like before
+            f = dh.Field(d)
+            self.assertFalse(f._outofcore)
+            self.assertEqual(f.shape, (20,))
+            g = dh.Field.from_dataset(d)
+            self.assertTrue(g._outofcore)
+            self.assertEqual(g.shape, (20,))
+            self.assertEqual(g.axes, f.axes)
+            npt.assert_equal(g[2:5].matrix, f[2:5].matrix)
+            npt.assert_equal(g.real.matrix, f.real.matrix)
+            npt.assert_equal(g.imag.matrix, f.imag.matrix)
+            npt.assert_equal(g.angle.matrix, f.angle.matrix)
+            npt.assert_allclose(g.sum().matrix, f.sum().matrix)
+        self.assertRaises(TypeError, dh.Field.from_dataset, m)
+
+
+class TestFieldParallel(unittest.TestCase):
+
+    def setUp(self):
+        self.settings = dh._parallel_threshold, dh.nproc
+        m = np.random.RandomState(1).rand(37, 11, 3)
+        axes = [dh.Axis(grid=np.arange(37)**2), dh.Axis(extent=(0, 1), n=11),
+                dh.Axis(extent=(-1, 1), n=3)]
+        self.f = dh.Field(m, axes=axes)
+        self.g = dh.Field(m[:, :, :1] + 1.0, axes=axes[:2] + [dh.Axis(extent=(-1, 1), n=1)])
+        self.expected = dict(sum=self.f.sum(axis=(0, 2)), mean=self.f.mean(),
+                             std=self.f.std(axis=1), fast=self.f.integrate(method='fast'),
+                             add=self.f + self.g, sin=np.sin(self.f))
+        # process everything in tiles
+        dh._parallel_threshold = 1
+        dh.nproc = 3
+
+    def tearDown(self):
+        dh._parallel_threshold, dh.nproc = self.settings
+
+    def test_parallel(self):
+        ret = dict(sum=self.f.sum(axis=(0, 2)), mean=self.f.mean(), std=self.f.std(axis=1),
+                   fast=self.f.integrate(method='fast'), add=self.f + self.g,
+                   sin=np.sin(self.f))
+        for k, expected in self.expected.items():
+            npt.assert_allclose(ret[k].matrix, expected.matrix)
+            self.assertEqual(ret[k].axes, expected.axes)
+        f = self.f.copy()
+        f += self.g
+        npt.assert_allclose(f.matrix, self.expected['add'].matrix)
+
+    def test_parallel_overlap(self):
+        f = self.f.copy()
+        expected = f.matrix + f.matrix[::-1]
+        np.add(f, f.matrix[::-1], out=f)
+        npt.assert_allclose(f.matrix, expected)
+
+
 if __name__ == '__main__':
     unittest.main()
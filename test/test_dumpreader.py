@@ -1,9 +1,59 @@
 #!/usr/bin/env python
 
 import unittest
+import os
+import gc
+import json
+import shutil
+import tempfile
+import threading
+import postpic
 import postpic.datareader as da
+from postpic.datareader.openPMDh5 import OpenPMDreader, FileSeries
 import numpy as np
 
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+
+def writeopenpmd(filename, iterations, shape=(8, 6)):
+    '''
+    writes a minimal openPMD file containing all `iterations`.
+    '''
+    with h5py.File(filename, 'w') as f:
+        f.attrs['iterationEncoding'] = np.string_('groupBased')
+        for it in iterations:
+            g = f.create_group('data/{:d}'.format(it))
+            g.attrs['time'] = 2.0 * it
+            g.attrs['timeUnitSI'] = 1e-15
+            for fname in ['E', 'B']:
+                fg = g.create_group('fields/' + fname)
+                fg.attrs['gridSpacing'] = np.array([1.0, 2.0])[:len(shape)]
+                fg.attrs['gridGlobalOffset'] = np.array([0.0, -6.0])[:len(shape)]
+                fg.attrs['gridUnitSI'] = 1e-6
+                for c in 'xyz':
+                    data = np.arange(np.prod(shape), dtype=np.float32).reshape(shape) + it
+                    d = fg.create_dataset(c, data=data, chunks=(2,) + shape[1:],
+                                          compression='gzip')
+                    d.attrs['unitSI'] = 3.0
+            sg = g.create_group('particles/electrons')
+            for c in 'xyz':
+                d = sg.create_dataset('position/' + c, data=np.linspace(0, 1, 5))
+                d.attrs['unitSI'] = 2.0
+                o = sg.create_group('positionOffset/' + c)
+                o.attrs['value'] = 10.0
+                o.attrs['shape'] = np.array([5])
+                o.attrs['unitSI'] = 0.5
+            d = sg.create_dataset('weighting', data=np.ones(5, dtype=np.float32))
+            d.attrs['unitSI'] = 1.0
+
+
+def _timestep(dr):
+    return dr.timestep()
+
+
 class TestDumpReader(unittest.TestCase):
 
     def setUp(self):
@@ -30,5 +80,254 @@ class TestDumpReader(unittest.TestCase):
         pz = self.dr1d.getSpecies('electron', 'pz')
         self.assertAlmostEqual(np.sum(pz), 0)
 
+    def test_map(self):
+        sr = da.readSim(20, dimensions=1)
+        self.assertEqual(list(sr.map(_timestep)), list(range(20)))
+        done = []
+        ret = list(sr.map(_timestep, workers=3, progress=lambda n, total: done.append(n)))
+        self.assertEqual(ret, list(range(20)))
+        self.assertEqual(done, list(range(1, 21)))
+
+        def failing(dr):
+            return 10 // dr.timestep()
+
+        self.assertRaises(RuntimeError, list, sr.map(failing, workers=2))
+        ret = list(sr.map(failing, workers=2, onerror='return'))
+        self.assertIsInstance(ret[0], ZeroDivisionError)
+        self.assertEqual(ret[1:3], [10, 5])
+        self.assertRaises(ValueError, list, sr.map(_timestep, backend='mpi'))
+
+    def test_dumpindex(self):
+        sr = da.readSim(6, dimensions=2)
+        np.testing.assert_allclose(sr.times(), np.arange(6) * 1e-10)
+        self.assertEqual(sr.dumpindex()[3]['step'], 3)
+        self.assertEqual(sr.at_time(2.2e-10).timestep(), 2)
+        self.assertEqual([dr.timestep() for dr in sr.between(1e-10, 3.5e-10)], [1, 2, 3])
+
+    def test_prefetch(self):
+        dr = da.readDump(100, dimensions=2)
+        ex = dr.Ex()
+        self.assertIs(dr.prefetch(['Ex', ('electron', 'x'), ('nospecies', 'x')]), dr)
+        dr.data = None  # all further reads must be answered from memory
+        np.testing.assert_equal(dr.Ex().matrix, ex.matrix)
+        np.testing.assert_equal(dr.Ex(slices=(5, slice(None))).matrix, ex.matrix[5])
+        np.testing.assert_equal(dr._readspecies('electron', 0), dr.getSpecies('electron', 'x'))
+        sr = da.readSim(8, dimensions=1)
+        self.assertEqual([dr.timestep() for dr in sr.prefetch(keys=['Ey'])], list(range(8)))
+        for dr in sr.prefetch(depth=3, keys=['Ey']):
+            np.testing.assert_equal(dr._prefetched['y'], sr[dr.timestep()].data('y'))
+
+    def test_prefetch_overlaps(self):
+        sr = da.readSim(4, dimensions=1)
+        opened = [threading.Event() for _ in range(len(sr))]
+
+        class Sr(type(sr)):
+            def __getitem__(self, n):
+                opened[n].set()
+                return super(Sr, self).__getitem__(n)
+        sr.__class__ = Sr
+        for dr in sr.prefetch(depth=1):
+            n = dr.timestep()
+            # the next dump is opened while the current one is still held
+            if n + 1 < len(sr):
+                self.assertTrue(opened[n + 1].wait(5))
+            if n + 2 < len(sr):
+                self.assertFalse(opened[n + 2].is_set())
+
+    def test_stack(self):
+        sr = da.readSim(5, dimensions=1)
+        streak = sr.stack(lambda dr: dr.Ey()[10:16], workers=2)
+        self.assertEqual(streak.shape, (5, 6))
+        self.assertEqual(streak.axes[0].name, 't')
+        np.testing.assert_allclose(streak.axes[0].grid, sr.times())
+        np.testing.assert_equal(streak.matrix[3], sr[3].Ey().matrix[10:16])
+        self.assertEqual(streak.axes[1], sr[0].Ey()[10:16].axes[0])
+        out = np.zeros((5,))
+        ret = sr.stack(lambda dr: dr.timestep() ** 2, out=out)
+        self.assertIs(ret.matrix, out)
+        np.testing.assert_equal(out, [0, 1, 4, 9, 16])
+        self.assertRaises(ValueError, sr.stack, lambda dr: dr.time(), out=np.zeros(4))
+        # every dump is opened only once
+        opened = []
+        getdr = sr._getDumpreader
+        sr._getDumpreader = lambda n: opened.append(n) or getdr(n)
+        sr.stack(lambda dr: dr.time())
+        self.assertEqual(sorted(opened), list(range(5)))
+
+    def test_subregion(self):
+        full = self.dr2d.Ey()
+        sub = self.dr2d.Ey(slices=(slice(10, 20), 5))
+        self.assertEqual(sub.shape, (10,))
+        np.testing.assert_equal(sub.matrix, full.matrix[10:20, 5])
+        self.assertEqual(sub.axes[0], full.axes[0][10:20])
+        sub = self.dr2d.Ey(extent=(0, 2, -1, 1))
+        cut = full.cutout((0, 2, -1, 1))
+        np.testing.assert_equal(sub.matrix, cut.matrix)
+        self.assertEqual(sub.axes, cut.axes)
+        self.assertRaises(ValueError, self.dr2d.Ey, extent=(0, 2, -1, 1), slices=(1, 2))
+
+    def test_subregion_reversed(self):
+        full = self.dr2d.Ex()
+        sub = self.dr2d.Ex(slices=(slice(None, None, -1), slice(None)))
+        np.testing.assert_equal(sub.matrix, full.matrix[::-1])
+        np.testing.assert_allclose(sub.axes[0].grid, full.axes[0].grid[::-1])
+        sub = self.dr2d.Ex(slices=(slice(20, 9, -1), 5))
+        np.testing.assert_equal(sub.matrix, full.matrix[20:9:-1, 5])
+        np.testing.assert_allclose(sub.axes[0].grid, full.axes[0].grid[20:9:-1])
+
+    def test_stride_reduce(self):
+        full = self.dr2d.Ex()
+        sub = self.dr2d.Ex(stride=(3, 4))
+        np.testing.assert_equal(sub.matrix, full.matrix[::3, ::4])
+        np.testing.assert_allclose(sub.axes[1].grid, full.axes[1].grid[::4])
+        red = full.half_resolution(0).half_resolution(0).half_resolution(1)
+        sub = self.dr2d.Ex(reduce=(4, 2))
+        np.testing.assert_allclose(sub.matrix, red.matrix)
+        np.testing.assert_allclose(sub.axes[0].grid_node, red.axes[0].grid_node)
+        np.testing.assert_allclose(sub.axes[0].grid, red.axes[0].grid, atol=1e-12)
+        # the dummy reader cannot read sub-regions, so the data is read only once
+        reads = []
+        data = self.dr2d.data
+        self.dr2d.data = lambda key: reads.append(key) or data(key)
+        try:
+            self.dr2d.Ex(reduce=2)
+        finally:
+            del self.dr2d.data
+        self.assertEqual(len(reads), 1)
+        # read in many small slabs, as a reader overriding dataslice would
+        slabsize = postpic._field_calc._reduce_slabsize
+        postpic._field_calc._reduce_slabsize = 1000
+        self.dr2d._partialreads = lambda: True
+        try:
+            sub = self.dr2d.Ex(slices=(slice(5, 298), 7), reduce=3)
+        finally:
+            postpic._field_calc._reduce_slabsize = slabsize
+            del self.dr2d._partialreads
+        np.testing.assert_allclose(sub.matrix,
+                                   full.matrix[5:296, 7].reshape(97, 3).mean(axis=1))
+        self.assertRaises(ValueError, self.dr2d.Ex, reduce=0)
+        self.assertRaises(ValueError, self.dr2d.Ex, slices=(1, 2), stride=(2, 2, 2))
+
+
+@unittest.skipIf(h5py is None, 'h5py not available')
+class TestOpenPMDReader(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        writeopenpmd(os.path.join(self.tmpdir, 'grouped.h5'), [100, 20, 300])
+        writeopenpmd(os.path.join(self.tmpdir, 'single.h5'), [5])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_iteration(self):
+        dr = OpenPMDreader(os.path.join(self.tmpdir, 'grouped.h5'))
+        self.assertEqual(dr.timestep(), 20)
+        dr = OpenPMDreader(os.path.join(self.tmpdir, 'grouped.h5'), iteration=300)
+        self.assertEqual(dr.timestep(), 300)
+        self.assertAlmostEqual(dr.time(), 600e-15)
+        self.assertRaises(KeyError, OpenPMDreader,
+                          os.path.join(self.tmpdir, 'grouped.h5'), iteration=7)
+
+    def test_data(self):
+        dr = OpenPMDreader(os.path.join(self.tmpdir, 'single.h5'))
+        ex = dr.data('fields/E/x')
+        self.assertEqual(ex.dtype, np.float64)
+        self.assertEqual(ex.shape, (8, 6))
+        self.assertAlmostEqual(ex[1, 2], 3.0 * (8 + 5))
+        x = dr.getSpecies('electrons', 'x')
+        np.testing.assert_allclose(x, 2.0 * np.linspace(0, 1, 5) + 5.0)
+        self.assertEqual(dr.getSpecies('electrons', 'weight').dtype, np.float64)
+        field = dr.Ey()
+        self.assertEqual(field.shape, (8, 6))
+        np.testing.assert_allclose(field.axes[1].extent, [-6e-6, 6e-6])
+
+    def test_subregion(self):
+        dr = OpenPMDreader(os.path.join(self.tmpdir, 'single.h5'))
+        full = dr.data('fields/E/x')
+        for slices in [(slice(1, 7, 2), slice(None, None, -1)), (-1, slice(4, 1, -2)),
+                       (slice(5, 5), 2)]:
+            np.testing.assert_equal(dr.dataslice('fields/E/x', slices), full[slices])
+        np.testing.assert_equal(dr.dataslice('particles/electrons/positionOffset/x', (-1,)),
+                                5.0)
+        field = dr.createfieldfromkey('fields/E/x', extent=(2e-6, 5e-6, -2e-6, 4e-6))
+        cut = dr.createfieldfromkey('fields/E/x').cutout((2e-6, 5e-6, -2e-6, 4e-6))
+        self.assertEqual(field.shape, (3, 3))
+        np.testing.assert_equal(field.matrix, cut.matrix)
+        np.testing.assert_allclose(field.axes[1].grid, cut.axes[1].grid)
+        self.assertTrue(dr._partialreads())
+        field = dr.createfieldfromkey('fields/E/x', stride=2, reduce=(2, 1))
+        np.testing.assert_allclose(field.matrix,
+                                   full[::2, ::2].reshape(2, 2, 3).mean(axis=1))
+        field = dr.Bz(slices=(slice(None), 0))
+        self.assertEqual(field.shape, (8,))
+        self.assertEqual(field.name, 'Bz')
+
+    def test_parallel_chunks(self):
+        fname = os.path.join(self.tmpdir, 'single.h5')
+        with h5py.File(fname, 'a') as f:
+            g = f['data/5/fields']
+            d = g.create_dataset('rho', shape=(11, 7), chunks=(3, 4), dtype=np.float32,
+                                 compression='gzip', fillvalue=-1)
+            d[:6, :] = np.arange(42).reshape(6, 7)
+            d.attrs['unitSI'] = 2.0
+            d = g.create_dataset('J', data=np.arange(77.).reshape(11, 7), chunks=(3, 4),
+                                 compression='gzip', shuffle=True)
+            d.attrs['unitSI'] = 1.0
+        dr1 = OpenPMDreader(fname)
+        dr3 = OpenPMDreader(fname, threads=3)
+        for key in ['fields/rho', 'fields/J', 'fields/E/x']:
+            np.testing.assert_equal(dr1.data(key), dr3.data(key))
+        self.assertEqual(dr3.data('fields/rho')[-1, -1], -2.0)
+        sr = FileSeries(os.path.join(self.tmpdir, '*.h5'), threads=2)
+        self.assertEqual(sr[0]._threads, 2)
+
+    def test_series(self):
+        sr = FileSeries(os.path.join(self.tmpdir, '*.h5'))
+        self.assertEqual(len(sr), 4)
+        self.assertEqual([dr.timestep() for dr in sr], [5, 20, 100, 300])
+        # all iterations of the same file share the file handle
+        self.assertIs(sr[1]._h5, sr[3]._h5)
+        self.assertNotEqual(sr[1], sr[2])
+        self.assertEqual(sr[1], sr[1])
+
+    def test_dumpindex(self):
+        sr = FileSeries(os.path.join(self.tmpdir, '*.h5'))
+        np.testing.assert_allclose(sr.times(), [10e-15, 40e-15, 200e-15, 600e-15])
+        self.assertIsNone(sr._dumpindex)
+        indexfile = os.path.join(self.tmpdir, '.postpic-dumpindex.json')
+        self.assertEqual(sr.dumpindex()[1]['species'], ['electrons'])
+        self.assertEqual(sr.at_time(190e-15).timestep(), 100)
+        # the index is only written on request
+        self.assertFalse(os.path.isfile(indexfile))
+        sr.dumpindex(cache=True)
+        self.assertTrue(os.path.isfile(indexfile))
+        # a new series reads the cached index
+        with open(indexfile) as f:
+            cache = json.load(f)
+        cache['grouped.h5:300']['time'] = 1.0
+        with open(indexfile, 'w') as f:
+            json.dump(cache, f)
+        sr = FileSeries(os.path.join(self.tmpdir, '*.h5'))
+        self.assertEqual(sr.dumpindex()[-1]['time'], 1.0)
+        self.assertEqual(sr.times()[-1], 1.0)
+        # but recognizes modified files
+        del sr
+        gc.collect()
+        writeopenpmd(os.path.join(self.tmpdir, 'grouped.h5'), [100, 20, 300, 400])
+        os.utime(os.path.join(self.tmpdir, 'grouped.h5'), (0, 0))
+        sr = FileSeries(os.path.join(self.tmpdir, '*.h5'))
+        np.testing.assert_allclose(sr._indextimes()[-2:], [600e-15, 800e-15])
+
+    def test_map(self):
+        sr = FileSeries(os.path.join(self.tmpdir, '*.h5'))
+        self.assertEqual(list(sr.map(_timestep, workers=2, backend='process')),
+                         [5, 20, 100, 300])
+        self.assertEqual(list(sr.map(_timestep, workers=2)), [5, 20, 100, 300])
+        streak = sr.stack(_timestep, workers=2, backend='process')
+        np.testing.assert_equal(streak.matrix, [5, 20, 100, 300])
+        np.testing.assert_allclose(streak.axes[0].grid, sr.times())
+
+
 if __name__ == '__main__':
     unittest.main()
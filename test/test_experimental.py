@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+
+import unittest
+import numpy as np
+import numpy.testing as npt
+import postpic as pp
+from postpic import experimental
+
+
+class TestKspacePropagateAdaptive(unittest.TestCase):
+
+    def setUp(self):
+        x = np.linspace(-20e-6, 20e-6, 80)
+        y = np.linspace(-30e-6, 30e-6, 60)
+        X, Y = np.meshgrid(x, y, indexing='ij')
+        m = np.exp(-X**2/(4e-6)**2 - Y**2/(5e-6)**2) * np.cos(1.5e6*X)
+        self.field = pp.Field(m, axes=[pp.Axis('x', 'm', extent=(x[0], x[-1]), n=80),
+                                       pp.Axis('y', 'm', extent=(y[0], y[-1]), n=60)])
+
+    def propagate(self, nsteps, **kwargs):
+        gen = experimental.kspace_propagate_adaptive(self.field, **kwargs)
+        return [(t, f.copy()) for (t, f), _ in zip(gen, range(nsteps))]
+
+    def test_padsize(self):
+        # the padding changes the result only slightly
+        coarse = self.propagate(3)
+        fine = self.propagate(3, fft_padsize=pp.helper.fftw_padsize)
+        for (t1, f1), (t2, f2) in zip(coarse, fine):
+            self.assertAlmostEqual(t1, t2)
+            m1, m2 = np.abs(f1.matrix), np.abs(f2.matrix)
+            self.assertAlmostEqual(m1.max() / m2.max(), 1, places=3)
+            self.assertAlmostEqual(np.sum(m1**2) / np.sum(m2**2), 1, places=3)
+            p1 = [ax.grid[i] for ax, i in zip(f1.axes, np.unravel_index(m1.argmax(), m1.shape))]
+            p2 = [ax.grid[i] for ax, i in zip(f2.axes, np.unravel_index(m2.argmax(), m2.shape))]
+            npt.assert_allclose(p1, p2, atol=0.1*f1.axes[0].spacing)
+        self.assertTrue(np.all(np.diff([t for t, f in coarse]) > 0))
+
+    def test_max_memory(self):
+        free = self.propagate(2)
+        limited = self.propagate(2, max_memory=2e5)
+        self.assertTrue(limited[0][0] < free[0][0])
+        with self.assertRaises(MemoryError):
+            self.propagate(1, max_memory=1e3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+import numpy.testing as npt
+import postpic._fft as _fft
+
+
+class TestNumpyBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = _fft.NumpyBackend()
+        self.a = np.random.random((16, 12)) + 1j * np.random.random((16, 12))
+
+    def test_fftn(self):
+        npt.assert_allclose(self.backend.fftn(self.a, axes=(1,), norm='ortho'),
+                            np.fft.fftn(self.a, axes=(1,), norm='ortho'))
+        npt.assert_allclose(self.backend.ifftn(self.backend.fftn(self.a)), self.a)
+
+    def test_real(self):
+        for shape, axes in [((7,), None), ((8, 5, 6), None), ((8, 5, 6), (0, 2)),
+                            ((5, 6, 7), (2, 0))]:
+            a = np.random.random(shape)
+            for norm in (None, 'ortho'):
+                npt.assert_allclose(self.backend.fftn(a, axes=axes, norm=norm),
+                                    np.fft.fftn(a, axes=axes, norm=norm), atol=1e-12)
+                npt.assert_allclose(self.backend.ifftn(a, axes=axes, norm=norm),
+                                    np.fft.ifftn(a, axes=axes, norm=norm), atol=1e-12)
+
+    def test_out(self):
+        out = np.empty_like(self.a)
+        ret = self.backend.fftn(self.a, norm='ortho', out=out)
+        self.assertTrue(ret is out)
+        npt.assert_allclose(out, np.fft.fftn(self.a, norm='ortho'))
+        a = self.a.copy()
+        ret = self.backend.ifftn(a, norm='ortho', out=a)
+        self.assertTrue(ret is a)
+        npt.assert_allclose(a, np.fft.ifftn(self.a, norm='ortho'))
+
+
+@unittest.skipIf(_fft.scipy_fft is None, 'scipy.fft not available')
+class TestScipyBackend(TestNumpyBackend):
+
+    def setUp(self):
+        self.backend = _fft.ScipyBackend(workers=2)
+        self.a = np.random.random((16, 12)) + 1j * np.random.random((16, 12))
+
+
+class TestFFTWBackend(TestNumpyBackend):
+
+    def setUp(self):
+        if _fft.pyfftw is None:
+            self.skipTest('pyfftw not available')
+        self.tmpdir = tempfile.mkdtemp()
+        self.wisdomfile = os.path.join(self.tmpdir, 'wisdom')
+        self.backend = _fft.FFTWBackend(planner_effort='FFTW_ESTIMATE',
+                                        wisdomfile=self.wisdomfile)
+        self.a = np.random.random((16, 12)) + 1j * np.random.random((16, 12))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_plancache(self):
+        self.backend.fftn(self.a)
+        self.backend.fftn(2 * self.a)
+        self.assertEqual(len(self.backend._plans), 1)
+        self.backend.ifftn(self.a)
+        self.backend.fftn(self.a[::2])
+        self.assertEqual(len(self.backend._plans), 3)
+        self.assertTrue(os.path.isfile(self.wisdomfile))
+
+    def test_norm(self):
+        with self.assertRaises(ValueError):
+            self.backend.fftn(self.a, norm='forward')
+        with self.assertRaises(ValueError):
+            self.backend.ifftn(self.a.real, norm='backward')
+
+    def test_inputs_unchanged(self):
+        a = self.a.copy()
+        r1 = self.backend.fftn(self.a[:, ::2])
+        r2 = self.backend.fftn(2 * self.a[:, ::2])
+        npt.assert_allclose(self.a, a)
+        npt.assert_allclose(2 * r1, r2)
+
+
+class _StubFFTW(object):
+    '''
+    the part of `pyfftw.FFTW` used by the backend, calculated by `numpy.fft`. Like pyfftw
+    it only accepts arrays of the planned shapes and dtypes.
+    '''
+    plans = 0
+
+    def __init__(self, a, b, axes, direction, flags, threads):
+        self.shapes = (a.shape, a.dtype, b.shape, b.dtype)
+        self.axes = axes
+        self.inverse = direction == 'FFTW_BACKWARD'
+        self.inplace = a is b
+        _StubFFTW.plans += 1
+
+    def __call__(self, a, b, normalise_idft=True, ortho=False):
+        assert (a.shape, a.dtype, b.shape, b.dtype) == self.shapes
+        assert self.inplace == (a is b)
+        assert normalise_idft != ortho
+        norm = 'ortho' if ortho else None
+        if np.isrealobj(a):
+            b[...] = np.fft.rfftn(a, axes=self.axes, norm=norm)
+        elif self.inverse:
+            b[...] = np.fft.ifftn(a, axes=self.axes, norm=norm)
+        else:
+            b[...] = np.fft.fftn(a, axes=self.axes, norm=norm)
+
+
+class _StubPyFFTW(object):
+    '''
+    replaces the pyfftw module, such that the plan cache of `FFTWBackend` can be tested
+    without pyfftw.
+    '''
+    FFTW = _StubFFTW
+    empty_aligned = staticmethod(np.empty)
+    byte_align = staticmethod(np.array)
+
+    def __init__(self):
+        self.wisdom = ()
+
+    def is_byte_aligned(self, a):
+        return True
+
+    def export_wisdom(self):
+        return (b'double wisdom', b'single wisdom', b'')
+
+    def import_wisdom(self, wisdom):
+        self.wisdom = wisdom
+
+
+class TestFFTWBackendStub(TestFFTWBackend):
+
+    def setUp(self):
+        self.addCleanup(setattr, _fft, 'pyfftw', _fft.pyfftw)
+        _fft.pyfftw = _StubPyFFTW()
+        super(TestFFTWBackendStub, self).setUp()
+
+    def test_plancache(self):
+        super(TestFFTWBackendStub, self).test_plancache()
+        plans = _StubFFTW.plans
+        self.backend.fftn(self.a)
+        self.backend.fftn(self.a.real)
+        self.assertEqual(_StubFFTW.plans, plans + 1)
+        a = self.a.copy()
+        self.backend.fftn(a, out=a)
+        self.assertEqual(_StubFFTW.plans, plans + 2)
+        self.backend.maxplans = 2
+        self.backend.ifftn(self.a[:4])
+        self.assertEqual(len(self.backend._plans), 2)
+
+    def test_wisdom(self):
+        self.backend.fftn(self.a)
+        backend = _fft.FFTWBackend(wisdomfile=self.wisdomfile)
+        self.assertEqual(_fft.pyfftw.wisdom, (b'double wisdom', b'single wisdom', b''))
+        with open(self.wisdomfile, 'w') as f:
+            f.write('invalid')
+        _fft.pyfftw.wisdom = ()
+        backend = _fft.FFTWBackend(wisdomfile=self.wisdomfile)
+        self.assertEqual(_fft.pyfftw.wisdom, ())
+        backend = _fft.FFTWBackend(wisdomfile=False)
+        backend.fftn(self.a)
+        self.assertEqual(os.listdir(self.tmpdir), ['wisdom'])
+
+
+class TestBackendChoice(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = _fft._backend
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachehome = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = self.tmpdir
+
+    def tearDown(self):
+        _fft._backend = self.backend
+        if self.cachehome is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.cachehome
+        shutil.rmtree(self.tmpdir)
+
+    def test_set(self):
+        backend = _fft.set_fft_backend('numpy')
+        self.assertTrue(isinstance(backend, _fft.NumpyBackend))
+        self.assertTrue(_fft.get_fft_backend() is backend)
+        with self.assertRaises(ValueError):
+            _fft.set_fft_backend('unknown')
+        with self.assertRaises(TypeError):
+            _fft.set_fft_backend('auto', workers=2)
+
+    def test_default(self):
+        _fft._backend = None
+        name = 'numpy' if _fft.scipy_fft is None else 'scipy'
+        self.assertEqual(_fft.get_fft_backend().name, name)
+        self.assertFalse(os.path.exists(_fft._cachefile('fft-backend.json')))
+
+    def test_auto(self):
+        name = _fft.set_fft_backend('auto').name
+        self.assertTrue(name in _fft._available())
+        if len(_fft._available()) > 1:
+            self.assertTrue(os.path.isfile(_fft._cachefile('fft-backend.json')))
+        self.assertEqual(_fft._autobackend(), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
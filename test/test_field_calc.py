@@ -14,5 +14,20 @@ class TestFieldAnalyzer(unittest.TestCase):
         emfield = self.dr.energydensityEM()
         self.assertEqual(emfield.name, 'Energy Density EM-Field')
 
+    def test_kspace_all(self):
+        for d in (1, 2, 3):
+            dr = pp.readDump(10000, dimensions=d)
+            components = ['Ex', 'Ey', 'Ez', 'Bx', 'By', 'Bz']
+            if d == 1:
+                # Ey, Ez, By and Bz need the fields along the missing axes in 1D
+                components = ['Ex', 'Bx']
+            for alignment in ('default', 'epoch'):
+                kall = dr.kspace_all(components, alignment=alignment)
+                self.assertEqual(sorted(kall), sorted(components))
+                for c in components:
+                    k = getattr(dr, 'kspace_' + c)(alignment=alignment)
+                    np.testing.assert_allclose(kall[c].matrix, k.matrix, atol=1e-20)
+                    self.assertEqual(kall[c].axes, k.axes)
+
 if __name__ == '__main__':
     unittest.main()
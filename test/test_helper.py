@@ -1,5 +1,8 @@
 #!/usr/bin/env python
 
+import os
+import shutil
+import tempfile
 import unittest
 import postpic as pp
 import numpy as np
@@ -105,6 +108,48 @@ class TestKspace(unittest.TestCase):
 
         kspace = pp.helper.kspace("Ex", fields=dict(Ex=dr.Ex(), By=dr.By(), Bz=dr.Bz()), extent=[0, 0.5, 0, 0.5, 0, 0.5])
 
+    def test_kspace_cache(self):
+        pp.chooseCode('dummy')
+        dr = pp.readDump(10000, dimensions=2)
+        fields = dict(Ex=dr.Ex(), Ey=dr.Ey(), Bz=dr.Bz())
+        pp.helper.clear_kspace_cache()
+        # nothing is kept between calls by default
+        kx = pp.helper.kspace("Ex", fields=fields)
+        self.assertEqual(len(pp.helper._kspace_cache), 0)
+        with pp.helper._kspace_cachescope():
+            pp.helper.kspace("Ex", fields=fields)
+            self.assertEqual(len(pp.helper._kspace_cache), 2)
+        self.assertEqual(len(pp.helper._kspace_cache), 0)
+        dr.kspace_all(['Ex', 'Ey'])
+        self.assertEqual(len(pp.helper._kspace_cache), 0)
+        previous = pp.helper.set_kspace_cachesize(4)
+        try:
+            kx = pp.helper.kspace("Ex", fields=fields)
+            self.assertEqual(len(pp.helper._kspace_cache), 2)
+            ky = pp.helper.kspace("Ey", fields=fields)
+            self.assertEqual(len(pp.helper._kspace_cache), 2)
+            pp.helper.clear_kspace_cache()
+            self.assertEqual(len(pp.helper._kspace_cache), 0)
+            npt.assert_allclose(pp.helper.kspace("Ex", fields=fields).matrix, kx.matrix)
+            npt.assert_allclose(pp.helper.kspace("Ey", fields=fields).matrix, ky.matrix)
+        finally:
+            pp.helper.set_kspace_cachesize(previous)
+        self.assertEqual(len(pp.helper._kspace_cache), 0)
+        dx = [ax.spacing for ax in dr.Ey().axes]
+        self.assertTrue(pp.helper.omega_yee_factory(dx, 1e-10) is
+                        pp.helper.omega_yee_factory(list(dx), 1e-10))
+
+    def test_kspace_inputs_unchanged(self):
+        pp.chooseCode('dummy')
+        dr = pp.readDump(10000, dimensions=3)
+        fields = dict(Ex=dr.Ex().fft(), By=dr.By().fft(), Bz=dr.Bz())
+        matrices = {k: v.matrix.copy() for k, v in fields.items()}
+        origins = {k: list(v.transformed_axes_origins) for k, v in fields.items()}
+        pp.helper.kspace("Ex", fields=fields, interpolation='fourier')
+        for k, v in fields.items():
+            npt.assert_equal(v.matrix, matrices[k])
+            self.assertEqual(v.transformed_axes_origins, origins[k])
+
     def test_kspace_epoch_like(self):
         pp.chooseCode('dummy')
         for d in (1,2,3):
@@ -120,11 +165,33 @@ class TestKspace(unittest.TestCase):
         kspace = pp.helper.kspace("Ex", fields=dict(Ex=dr.Ex(), By=dr.By(), Bz=dr.Bz()))
         pp.helper.kspace_propagate(kspace, 0.1, moving_window_vect=(1,0))
 
+    def test_kspace_propagate_views(self):
+        pp.chooseCode('dummy')
+        dr = pp.readDump(10000, dimensions=2)
+        kspace = pp.helper.kspace("Ex", fields=dict(Ex=dr.Ex(), By=dr.By(), Bz=dr.Bz()))
+        for field in (kspace, kspace.fft()):
+            m = field.matrix.copy()
+            kw = dict(moving_window_vect=(1, 0), nsteps=4)
+            ref = [f.matrix.copy() for f in pp.helper.kspace_propagate(field, 1e-15, **kw)]
+            views = pp.helper.kspace_propagate(field, 1e-15, yield_views=True, **kw)
+            last = None
+            for i, f in enumerate(views):
+                npt.assert_allclose(f.matrix, ref[i], atol=1e-12*np.abs(ref[i]).max())
+                if last is not None:
+                    # the field yielded before stays valid for one more step
+                    npt.assert_allclose(last.matrix, ref[i-1], atol=1e-12*np.abs(ref[i]).max())
+                    self.assertFalse(np.may_share_memory(f.matrix, last.matrix))
+                last = f
+            npt.assert_equal(field.matrix, m)
+
     def test_time_profile_at_plane(self):
         dr = pp.readDump(10000, dimensions=3)
         kspace = pp.helper.kspace("Ex", fields=dict(Ex=dr.Ex(), By=dr.By(), Bz=dr.Bz()))
         complex_ex = kspace.fft()
-        pp.helper.time_profile_at_plane(complex_ex, axis='z', value=1.0, dir=-1)
+        tp = pp.helper.time_profile_at_plane(complex_ex, axis='z', value=1.0, dir=-1)
+        tp3 = pp.helper.time_profile_at_plane(complex_ex, axis='z', value=1.0, dir=-1, threads=3)
+        npt.assert_allclose(tp3.matrix, tp.matrix, rtol=1e-9, atol=1e-9*np.abs(tp.matrix).max())
+        self.assertEqual(tp3.axes, tp.axes)
 
 
 class TestHelper(unittest.TestCase):
@@ -144,6 +211,35 @@ class TestHelper(unittest.TestCase):
         self.assertEqual(fft_padsize(250), 250)
         self.assertEqual(fft_padsize(251), 252)
 
+    def test_fftpadsize_coarse(self):
+        sizes = [pp.helper.fft_padsize_coarse(n) for n in (1, 5, 6, 7, 13, 24, 25, 200)]
+        self.assertEqual(sizes, [1, 6, 6, 8, 16, 24, 32, 256])
+
+    def test_atomicwrite(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmpdir, 'sub', 'file.txt')
+            self.assertTrue(pp.helper._atomicwrite(filename, lambda f: f.write('abc')))
+            with open(filename) as f:
+                self.assertEqual(f.read(), 'abc')
+            # the parent is a file, so it cannot be written
+            self.assertFalse(pp.helper._atomicwrite(os.path.join(filename, 'x'),
+                                                    lambda f: f.write('abc')))
+            self.assertEqual(os.listdir(os.path.dirname(filename)), ['file.txt'])
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_linear_phase_factors(self):
+        f = pp.Field(np.ones((6, 5, 4)), axes=[pp.Axis(extent=(1, 2), n=6),
+                                               pp.Axis(extent=(-1, 3), n=5),
+                                               pp.Axis(extent=(0, 1), n=4)])
+        dx = {0: 0.3, 1: 0.0, 2: -1.2}
+        c, factors = pp.helper._linear_phase_factors(f, dx, phi0=0.7)
+        self.assertEqual(sorted(factors), ['p0', 'p2'])
+        self.assertEqual(factors['p2'].shape, (1, 1, 4))
+        self.assertAllClose(c * factors['p0'] * factors['p2'] * np.ones(f.shape),
+                            pp.helper.linear_phase(f, dx, phi0=0.7))
+
     def test_map_coordinates_parallel(self):
         xf = np.linspace(-1, 1, 128)
         yf = xf
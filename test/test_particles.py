@@ -4,6 +4,19 @@ import unittest
 import postpic as pp
 import numpy as np
 
+class TestParticleHistory(unittest.TestCase):
+
+    def test_collect(self):
+        pp.chooseCode('dummy')
+        sr = pp.readSim(3, dimensions=2)
+        expected = pp.ParticleHistory(sr, 'electron', ids=[1, 5]).collect('x', 'px')
+        # any iterable of dumpreaders works
+        ret = pp.ParticleHistory(list(sr), 'electron', ids=[1, 5]).collect('x', 'px')
+        self.assertEqual(len(ret), len(expected))
+        for a, b in zip(ret, expected):
+            np.testing.assert_equal(a, b)
+
+
 class TestMultiSpecies(unittest.TestCase):
 
     def setUp(self):